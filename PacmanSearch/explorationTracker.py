@@ -0,0 +1,114 @@
+# explorationTracker.py
+# ---------------------
+# Opt-in tracking of the states created by GameState.generateSuccessor.
+#
+# Nothing is tracked unless a tracker is installed, for one game or for a
+# block of code:
+#
+#     with GameState.trackExploration(ExplorationTracker('bloom')) as tracker:
+#         ...
+#     print(tracker.generated, tracker.uniqueStates())
+#
+# A tracker never keeps states, only 64-bit fingerprints (the state hash):
+#
+#     'count'  counts the successors generated and nothing else
+#     'exact'  keeps a set of fingerprints; exact up to hash collisions
+#     'bloom'  sets bits of a fixed-size Bloom filter and estimates the number
+#              of unique states from the fraction of bits set, in constant
+#              memory
+#
+# With sampleRate < 1 only the states whose fingerprint falls in that
+# fraction of the hash range are kept. The same state is always in or always
+# out of the sample, so uniqueStates() scales the sampled count back up.
+
+import math
+
+FINGERPRINT_MASK = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+
+def fingerprint(state):
+    return hash(state) & FINGERPRINT_MASK
+
+class ExplorationTracker:
+    """
+    Counts generated successors and (approximately) unique states.
+    """
+    MODES = ('count', 'exact', 'bloom')
+
+    def __init__(self, mode='count', sampleRate=1.0, bloomBits=1 << 23, bloomHashes=4):
+        if mode not in self.MODES:
+            raise ValueError('Unknown exploration tracking mode: ' + str(mode))
+        if not 0 < sampleRate <= 1:
+            raise ValueError('sampleRate must be in (0, 1]')
+        self.mode = mode
+        self.sampleRate = sampleRate
+        self.sampleLimit = int(sampleRate * (1 << 64))
+        self.bloomBits = bloomBits
+        self.bloomHashes = bloomHashes
+        self.reset()
+
+    def reset(self):
+        """
+        Starts counting again; returns the fingerprints kept so far in
+        'exact' mode and an empty set otherwise.
+        """
+        seen = getattr(self, 'seen', None)
+        self.generated = 0
+        self.sampled = 0
+        self.seen = set() if self.mode == 'exact' else None
+        self.bloom = bytearray(self.bloomBits // 8) if self.mode == 'bloom' else None
+        self.bitsSet = 0
+        return seen if seen is not None else set()
+
+    def record(self, parent, child):
+        """
+        Called by GameState.generateSuccessor for every successor.
+        """
+        self.generated += 1
+        if self.mode == 'count':
+            return
+        for state in (parent, child):
+            key = fingerprint(state)
+            # Multiplying spreads the hash over the 64-bit range before sampling
+            if self.sampleRate < 1 and (key * GOLDEN) & FINGERPRINT_MASK >= self.sampleLimit:
+                continue
+            self.sampled += 1
+            if self.mode == 'exact':
+                self.seen.add(key)
+            else:
+                self._addToBloom(key)
+
+    def _addToBloom(self, key):
+        # Double hashing: the i-th bit is h1 + i * h2, both taken from the mixed fingerprint
+        mixed = (key * GOLDEN) & FINGERPRINT_MASK
+        h1, h2 = mixed >> 32, (mixed & 0xFFFFFFFF) | 1
+        for i in range(self.bloomHashes):
+            bit = (h1 + i * h2) % self.bloomBits
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.bloom[byte] & mask:
+                self.bloom[byte] |= mask
+                self.bitsSet += 1
+
+    def uniqueStates(self):
+        """
+        Number of different states seen (parents and successors), or None
+        in 'count' mode. In 'bloom' mode this is the estimate
+        -(m / k) ln(1 - X / m) for m bits, k hashes and X bits set.
+        """
+        if self.mode == 'count':
+            return None
+        if self.mode == 'exact':
+            unique = len(self.seen)
+        elif self.bitsSet >= self.bloomBits:
+            unique = float('inf')
+        else:
+            m, k = float(self.bloomBits), self.bloomHashes
+            unique = -m / k * math.log(1 - self.bitsSet / m)
+        return unique / self.sampleRate
+
+    def __str__(self):
+        unique = self.uniqueStates()
+        if unique is None:
+            return '%d successors generated' % self.generated
+        approximate = '' if self.mode == 'exact' and self.sampleRate == 1 else '~'
+        return '%d successors generated, %s%.0f unique states' % (self.generated, approximate, unique)
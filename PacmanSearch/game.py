@@ -22,6 +22,7 @@
 
 from util import *
 import time, os
+import random
 import traceback
 import sys
 
@@ -274,6 +275,193 @@ class Grid:
                 bools.append(False)
         return bools
 
+class BitGrid(Grid):
+    """
+    A boolean Grid that keeps its cells as bits of one integer, next to the
+    columns, so that hashing, counting and comparing do not scan the cells:
+
+      - the hash is the XOR of a random 64-bit key for every True cell and is
+        updated when a cell changes,
+      - the number of True cells is kept up to date as well,
+      - equality compares the two integers.
+
+    Copies are copy-on-write. copy() only copies the list of columns; a
+    column the grid shares is handed out as a BitGridColumnView, which reads
+    the shared column and copies it into the grid on the first write, so a
+    successor state that eats one dot copies one column instead of all of
+    them. grid[x][y] reads and writes as with Grid.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.owner = object()
+        self.data = [BitGridColumn(self, x, [initialValue] * height) for x in range(width)]
+        self.keys = bitGridKeys(width * height)
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+            self.numTrue = width * height
+            self.hash = 0
+            for key in self.keys[:width * height]:
+                self.hash ^= key
+        else:
+            self.bits = 0
+            self.numTrue = 0
+            self.hash = 0
+        self.trueList = None
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def fromGrid(grid):
+        """
+        A BitGrid with the cells of a boolean Grid, built in one pass instead
+        of one tracked write per cell.
+        """
+        g = BitGrid(grid.width, grid.height)
+        g.data = [BitGridColumn(g, x, [bool(value) for value in column]) for x, column in enumerate(grid.data)]
+        for x, y in grid.asList():
+            cell = x * g.height + y
+            g.bits |= 1 << cell
+            g.hash ^= g.keys[cell]
+            g.numTrue += 1
+        return g
+    fromGrid = staticmethod(fromGrid)
+
+    def __getitem__(self, i):
+        column = self.data[i]
+        if column.owner is self.owner:
+            return column
+        return BitGridColumnView(self, i)
+
+    def __setitem__(self, key, item):
+        column = self[key]
+        for y in range(self.height):
+            column[y] = item[y]
+
+    def _ownColumn(self, x):
+        # Column x, copied first if another grid shares it
+        column = self.data[x]
+        if column.owner is not self.owner:
+            column = self.data[x] = BitGridColumn(self, x, column)
+        return column
+
+    def _set(self, x, y, value):
+        cell = x * self.height + y
+        self.bits ^= 1 << cell
+        self.hash ^= self.keys[cell]
+        self.numTrue += 1 if value else -1
+        self.trueList = None
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.width == other.width and self.height == other.height
+        return self.data == other.data
+
+    def __hash__(self):
+        return self.hash
+
+    def copy(self):
+        g = BitGrid.__new__(BitGrid)
+        g.__dict__.update(self.__dict__)
+        g.data = self.data[:]
+        # Neither grid owns the shared columns any more
+        g.owner = object()
+        self.owner = object()
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # Writes to a copy are not shared, but every caller copies before writing anyway
+        return self.copy()
+
+    def count(self, item =True ):
+        if item is True or item is False:
+            return self.numTrue if item else self.width * self.height - self.numTrue
+        return 0
+
+    def asList(self, key = True):
+        if key is not True:
+            return Grid.asList(self, key)
+        if self.trueList is None:
+            self.trueList = []
+            bits = self.bits
+            while bits:
+                lowest = bits & -bits
+                self.trueList.append(self._cellIndexToPosition(lowest.bit_length() - 1))
+                bits ^= lowest
+        return self.trueList[:]
+
+class BitGridColumn(list):
+    """
+    A column of a BitGrid. Reads are plain list reads; writes also update the
+    bits, hash and count of the grid the column was made for, after copying
+    the column into that grid if a copy of the grid now shares it.
+    """
+    __slots__ = ('grid', 'owner', 'x')
+
+    def __init__(self, grid, x, values):
+        list.__init__(self, values)
+        self.grid = grid
+        self.owner = grid.owner
+        self.x = x
+
+    def __setitem__(self, y, value):
+        value = bool(value)
+        if list.__getitem__(self, y) != value:
+            grid = self.grid
+            column = self if self.owner is grid.owner else grid._ownColumn(self.x)
+            list.__setitem__(column, y, value)
+            grid._set(self.x, y, value)
+
+class BitGridColumnView:
+    """
+    Column x of a BitGrid that shares it with a copy. Reads go to the
+    shared column; the first write copies it into the grid the view came
+    from, however many grids read it in between.
+    """
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        return self.grid.data[self.x][y]
+
+    def __setitem__(self, y, value):
+        self.grid._ownColumn(self.x)[y] = value
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        return iter(self.grid.data[self.x])
+
+    def __eq__(self, other):
+        if isinstance(other, BitGridColumnView): other = other.grid.data[other.x]
+        return self.grid.data[self.x] == other
+
+    def __repr__(self):
+        return repr(self.grid.data[self.x])
+
+BIT_GRID_KEYS = []
+
+def bitGridKeys(size):
+    """
+    The random hash keys of the first size cells, shared by all BitGrids.
+    They come from their own generator, so making them does not change the
+    games played with a fixed random seed.
+    """
+    if len(BIT_GRID_KEYS) < size:
+        generator = random.Random(len(BIT_GRID_KEYS))
+        BIT_GRID_KEYS.extend(generator.getrandbits(64) for _ in range(size - len(BIT_GRID_KEYS)))
+    return BIT_GRID_KEYS
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -368,6 +556,48 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class ZobristKeys:
+    """
+    Random 64-bit keys for the hash of a GameStateData: one per capsule
+    position, and one per position, direction and scared timer of each
+    agent. XORing the keys of what a state holds gives its hash, and a
+    change only XORs out the old key and XORs in the new one. Keys are
+    drawn the first time a value is seen, from a generator of their own.
+    """
+    def __init__( self, width, height ):
+        self.generator = random.Random( 'zobrist %d %d' % ( width, height ) )
+        self.capsules = {}
+        self.agents = []
+
+    def key( self, table, value ):
+        key = table.get( value )
+        if key == None:
+            key = table[value] = self.generator.getrandbits( 64 )
+        return key
+
+    def capsuleKey( self, position ):
+        return self.key( self.capsules, position )
+
+    def agentKey( self, index, agentState ):
+        if agentState.configuration == None: return 0
+        while len( self.agents ) <= index:
+            self.agents.append( ( {}, {}, {} ) )
+        positions, directions, timers = self.agents[index]
+        configuration = agentState.configuration
+        return ( self.key( positions, configuration.pos ) ^ self.key( directions, configuration.direction ) ^
+                 self.key( timers, agentState.scaredTimer ) )
+
+ZOBRIST_KEYS = {}
+
+def zobristKeys( width, height ):
+    """
+    The ZobristKeys shared by every state on a board of this size, so that
+    deep copies of a state (which copy the layout) hash the same.
+    """
+    if ( width, height ) not in ZOBRIST_KEYS:
+        ZOBRIST_KEYS[( width, height )] = ZobristKeys( width, height )
+    return ZOBRIST_KEYS[( width, height )]
+
 class GameStateData:
     """
 
@@ -377,12 +607,18 @@ class GameStateData:
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
+            # The food is shared with the previous state until one of them eats (see eatFood)
+            self.food = prevState.food
+            self.numFood = prevState.numFood
+            self._foodPositions = prevState._foodPositions
+            self._ownsFood = prevState._ownsFood = False
             self.capsules = prevState.capsules[:]
             self.agentStates = self.copyAgentStates( prevState.agentStates )
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self.zobristKeys = prevState.zobristKeys
+            self.zobrist = prevState.zobrist
 
         self._foodEaten = None
         self._foodAdded = None
@@ -395,6 +631,9 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
+        if self._foodPositions != None:
+            state._foodPositions = set(self._foodPositions)
+        state._ownsFood = True
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
@@ -402,6 +641,31 @@ class GameStateData:
         state._capsuleEaten = self._capsuleEaten
         return state
 
+    def eatFood( self, x, y ):
+        """
+        Removes the food at (x, y), which must be there. The food grid and
+        position set are copied first if they are still shared with another
+        state; the count is updated in O(1).
+        """
+        if not self._ownsFood:
+            self.food = self.food.copy()
+            if self._foodPositions != None:
+                self._foodPositions = set(self._foodPositions)
+            self._ownsFood = True
+        self.food[x][y] = False
+        self.numFood -= 1
+        if self._foodPositions != None:
+            self._foodPositions.discard((x, y))
+
+    def getFoodPositions( self ):
+        """
+        The set of (x, y) positions with food left. It is built on first use
+        and shared with successor states, so it must not be modified.
+        """
+        if self._foodPositions == None:
+            self._foodPositions = set(self.food.asList())
+        return self._foodPositions
+
     def copyAgentStates( self, agentStates ):
         copiedStates = []
         for agentState in agentStates:
@@ -414,6 +678,8 @@ class GameStateData:
         """
         if other == None: return False
         # TODO Check for type of other
+        # Equal states always have equal hashes, so a mismatch settles it
+        if hash(self) != hash(other): return False
         if not self.agentStates == other.agentStates: return False
         if not self.food == other.food: return False
         if not self.capsules == other.capsules: return False
@@ -422,15 +688,37 @@ class GameStateData:
 
     def __hash__( self ):
         """
-        Allows states to be keys of dictionaries.
+        Allows states to be keys of dictionaries. The agents and capsules
+        are covered by the incremental Zobrist hash and the food by the
+        hash of its grid, so this is O(1).
+        """
+        return hash((self.zobrist ^ hash(self.food), self.score))
+
+    def computeZobrist( self ):
+        """
+        The Zobrist hash of the agents and capsules, computed from scratch.
+        The rules keep self.zobrist equal to it with hashAgent and
+        hashCapsule.
+        """
+        zobrist = 0
+        for index, agentState in enumerate( self.agentStates ):
+            zobrist ^= self.zobristKeys.agentKey( index, agentState )
+        for capsule in self.capsules:
+            zobrist ^= self.zobristKeys.capsuleKey( capsule )
+        return zobrist
+
+    def hashAgent( self, index ):
+        """
+        Toggles agent index in the hash: call it once before and once after
+        changing the configuration or scared timer of the agent.
+        """
+        self.zobrist ^= self.zobristKeys.agentKey( index, self.agentStates[index] )
+
+    def hashCapsule( self, position ):
+        """
+        Toggles the capsule at position in the hash, when it is added or removed.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        self.zobrist ^= self.zobristKeys.capsuleKey( position )
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -489,6 +777,9 @@ class GameStateData:
         Creates an initial game state from a layout array (see layout.py).
         """
         self.food = layout.food.copy()
+        self.numFood = self.food.count()
+        self._foodPositions = None
+        self._ownsFood = True
         #self.capsules = []
         self.capsules = layout.capsules[:]
         self.layout = layout
@@ -503,6 +794,8 @@ class GameStateData:
                 else: numGhosts += 1
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
+        self.zobristKeys = zobristKeys( layout.width, layout.height )
+        self.zobrist = self.computeZobrist()
 
 try:
     import boinc
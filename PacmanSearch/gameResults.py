@@ -0,0 +1,255 @@
+# gameResults.py
+# --------------
+# Per-game result records and the sinks that receive them.
+#
+# runGames and runBatch (pacman.py) turn every finished game into a small
+# record (see gameRecord) and hand it to each sink right away, so no Game is
+# kept around. A sink has add(record) and close():
+#
+#     JsonLinesSink  writes one JSON object per line
+#     CsvSink        writes one CSV row per game
+#     ResultAggregator
+#                    keeps running statistics in constant memory: mean,
+#                    variance, min and max of score, moves and agent time
+#                    (Welford's method), the win rate, and score
+#                    percentiles: exact over the first 100 games, then
+#                    estimated with the P-square algorithm (Jain &
+#                    Chlamtac, 1985), five markers per percentile.
+#
+# python gameResults.py compares the streamed percentiles with exact ones.
+
+import bisect
+import csv
+import json
+import math
+import random
+
+def gameRecord(index, game, seed=None):
+    """
+    The compact record of a finished game. agentTime is Pacman's total
+    computing time, which Game only measures with catchExceptions.
+    """
+    state = game.state
+    return {'game': index, 'seed': seed, 'score': state.getScore(), 'win': state.isWin(),
+            'moves': len(game.moveHistory), 'agentTime': game.totalAgentTimes[0], 'crashed': game.agentCrashed,
+            'cutOff': not (state.isWin() or state.isLose() or game.agentCrashed)}
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.file = open(path, 'w')
+
+    def add(self, record):
+        # Strict JSON has no Infinity or NaN, which a saturated bloom ExplorationTracker can report: write null
+        record = {key: None if isinstance(value, float) and not math.isfinite(value) else value
+                  for key, value in record.items()}
+        self.file.write(json.dumps(record, allow_nan=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class CsvSink:
+    """
+    The columns are the keys of the first record.
+    """
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = None
+
+    def add(self, record):
+        if self.writer == None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(record), extrasaction='ignore',
+                                         lineterminator='\n')
+            self.writer.writeheader()
+        self.writer.writerow(record)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def openResultSink(path):
+    """
+    A CsvSink for a .csv path and a JsonLinesSink for anything else.
+    """
+    if path.lower().endswith('.csv'):
+        return CsvSink(path)
+    return JsonLinesSink(path)
+
+class RunningStat:
+    """
+    Count, mean, variance, min and max of a stream (Welford's method).
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min == None or value < self.min: self.min = value
+        if self.max == None or value > self.max: self.max = value
+
+    def variance(self):
+        if self.count < 2: return 0.0
+        return self.m2 / (self.count - 1)
+
+    def stdDev(self):
+        return math.sqrt(self.variance())
+
+class P2Quantile:
+    """
+    Streaming estimate of the p-quantile. The first exactSize values are
+    kept sorted and their nearest-rank quantile is exact; after that the
+    buffer is reduced to five markers that P-square moves along.
+    """
+    def __init__(self, p, exactSize=100):
+        self.p = p
+        self.exactSize = max(5, exactSize)
+        self.exact = []
+        self.heights = None
+
+    def add(self, value):
+        if self.heights == None:
+            bisect.insort(self.exact, value)
+            if len(self.exact) > self.exactSize:
+                self._startMarkers()
+            return
+        heights, positions = self.heights, self.positions
+
+        # Find the cell of the new value, stretching the extreme markers if needed
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            offset = self.desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or \
+               (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _startMarkers(self):
+        # Markers at the ranks P-square would have driven them to after n values, read off the sorted buffer
+        values, p = self.exact, self.p
+        n = len(values)
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+        self.desired = [1 + (n - 1) * increment for increment in self.increments]
+        self.positions = []
+        for i, desired in enumerate(self.desired):
+            lowest = self.positions[-1] + 1 if self.positions else 1
+            self.positions.append(min(max(int(round(desired)), lowest), n - 4 + i))
+        self.heights = [values[position - 1] for position in self.positions]
+        self.exact = None
+
+    def _parabolic(self, i, step):
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        if self.heights == None:
+            if not self.exact: return None
+            return nearestRank(self.exact, self.p)
+        return self.heights[2]
+
+def nearestRank(values, p):
+    """
+    The nearest-rank p-quantile of the sorted list values.
+    """
+    return values[max(0, int(math.ceil(p * len(values))) - 1)]
+
+class ResultAggregator:
+    """
+    Running statistics over game records, in constant memory.
+    """
+    def __init__(self, percentiles=(0.1, 0.5, 0.9)):
+        self.games = 0
+        self.wins = 0
+        self.cutOff = 0
+        self.crashed = 0
+        self.score = RunningStat()
+        self.moves = RunningStat()
+        self.agentTime = RunningStat()
+        self.scorePercentiles = [P2Quantile(p) for p in percentiles]
+
+    def add(self, record):
+        self.games += 1
+        self.wins += int(record['win'])
+        self.cutOff += int(record['cutOff'])
+        self.crashed += int(record['crashed'])
+        self.score.add(record['score'])
+        self.moves.add(record['moves'])
+        self.agentTime.add(record['agentTime'])
+        for quantile in self.scorePercentiles:
+            quantile.add(record['score'])
+
+    def close(self):
+        pass
+
+    def winRate(self):
+        return self.wins / float(self.games) if self.games else 0.0
+
+    def summary(self):
+        """
+        A few lines in the format of runGames' old report.
+        """
+        lines = ['Average Score: %.2f (std. dev. %.2f, min %d, max %d)' %
+                 (self.score.mean, self.score.stdDev(), self.score.min, self.score.max),
+                 'Score Percentiles: ' + ', '.join('%d%%: %.1f' % (round(quantile.p * 100), quantile.value())
+                                                   for quantile in self.scorePercentiles),
+                 'Win Rate:      %d/%d (%.2f)' % (self.wins, self.games, self.winRate()),
+                 'Average Moves: %.1f, agent time per game: %.3fs' % (self.moves.mean, self.agentTime.mean)]
+        if self.cutOff or self.crashed:
+            lines.append('Cut off:       %d, crashed: %d' % (self.cutOff, self.crashed))
+        return '\n'.join(lines)
+
+def checkPercentiles(trials=200, sizes=(6, 20, 100, 1000, 10000), percentiles=(0.1, 0.5, 0.9)):
+    """
+    Mean absolute error of P2Quantile against the exact percentiles, over
+    random batches of game-like scores (a loss cluster and a win cluster).
+    Up to exactSize values the two must agree.
+    """
+    rng = random.Random(0)
+    for size in sizes:
+        errors = [0.0] * len(percentiles)
+        for _ in range(trials):
+            quantiles = [P2Quantile(p) for p in percentiles]
+            scores = []
+            for _ in range(size):
+                score = rng.gauss(1200, 150) if rng.random() < 0.6 else rng.gauss(-200, 100)
+                scores.append(score)
+                for quantile in quantiles:
+                    quantile.add(score)
+            scores.sort()
+            for i, quantile in enumerate(quantiles):
+                error = abs(quantile.value() - nearestRank(scores, quantile.p))
+                if size <= quantile.exactSize and error != 0:
+                    raise AssertionError('%d%% of %d scores is not exact' % (round(quantile.p * 100), size))
+                errors[i] += error / trials
+        print('n=%-6d mean absolute error: %s' % (size, ', '.join('%d%%: %.1f' % (round(p * 100), error)
+                                                                  for p, error in zip(percentiles, errors))))
+
+if __name__ == '__main__':
+    checkPercentiles()
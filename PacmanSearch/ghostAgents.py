@@ -16,7 +16,6 @@ from game import Agent
 from game import Actions
 from game import Directions
 import random
-from util import manhattanDistance
 import util
 
 class GhostAgent( Agent ):
@@ -64,7 +63,8 @@ class DirectionalGhost( GhostAgent ):
         pacmanPosition = state.getPacmanPosition()
 
         # Select best actions given the state
-        distancesToPacman = [manhattanDistance( pos, pacmanPosition ) for pos in newPositions]
+        mazeDistances = state.data.layout.getDistances()
+        distancesToPacman = [mazeDistances.getDistance( pos, pacmanPosition ) for pos in newPositions]
         if isScared:
             bestScore = max( distancesToPacman )
             bestProb = self.prob_scaredFlee
@@ -0,0 +1,102 @@
+# gridBenchmark.py
+# ----------------
+# Checks and times the BitGrid of game.py against the plain Grid. Run
+#
+#     python gridBenchmark.py [layout] [repeat]
+#
+# to check that copies of a BitGrid never write into each other, and then to
+# time the grid operations of a game step with both grids.
+
+import random
+import sys
+import time
+
+from game import BitGrid, Grid
+
+def checkGridCopies(steps=5000, width=6, height=5, seed=0):
+    """
+    Checks BitGrid copy-on-write against Grid: a column held from one grid
+    writes to that grid only, whatever copies of it are read in between,
+    and random reads, writes and copies keep the cells, count, asList and
+    hash of every grid right. Returns the number of steps checked.
+    """
+    a = BitGrid(3, 3)
+    b = a.copy()
+    column = a[1]
+    b[1][0]
+    column[2] = True
+    if not a[1][2] or b[1][2] or a.count() != 1 or b.count() != 0 or hash(b) != hash(BitGrid(3, 3)):
+        raise AssertionError('a column held from a grid wrote into its copy')
+    c = a.copy()
+    column = a[1]
+    c[1][2] = False
+    column[0] = True
+    if a[1] != [True, False, True] or c[1] != [False, False, False] or a.count() != 2 or c.count() != 0:
+        raise AssertionError('a write through a copy reached the grid it was copied from')
+
+    rng = random.Random(seed)
+    grids = [(BitGrid(width, height), Grid(width, height))]
+    held = []
+    for _ in range(steps):
+        index = rng.randrange(len(grids))
+        bitGrid, grid = grids[index]
+        x, y, value = rng.randrange(width), rng.randrange(height), rng.random() < 0.5
+        operation = rng.random()
+        if operation < 0.1:
+            grids.append((bitGrid.copy(), grid.copy()))
+        elif operation < 0.3:
+            held.append((index, x, bitGrid[x]))
+        elif operation < 0.5 and held:
+            index, x, column = held.pop(rng.randrange(len(held)))
+            column[y] = value
+            grids[index][1][x][y] = value
+        else:
+            bitGrid[x][y] = value
+            grid[x][y] = value
+        for bitGrid, grid in grids:
+            expected = BitGrid.fromGrid(grid)
+            if [list(column) for column in bitGrid.data] != grid.data or bitGrid.count() != grid.count() or \
+               sorted(bitGrid.asList()) != sorted(grid.asList()) or bitGrid != expected or hash(bitGrid) != hash(expected):
+                raise AssertionError('BitGrid differs from Grid')
+    return steps
+
+def benchmarkGrids(layoutName='mediumClassic', repeat=20000):
+    """
+    Times the grid operations of a game step on the food of a layout, for
+    Grid and BitGrid.
+    """
+    import layout
+    food = layout.getLayout(layoutName).food
+    x, y = food.asList()[0]
+    grids = [('Grid', Grid(food.width, food.height)), ('BitGrid', BitGrid(food.width, food.height))]
+    for name, grid in grids:
+        for fx, fy in food.asList():
+            grid[fx][fy] = True
+
+    def eat(grid):
+        grid = grid.copy()
+        grid[x][y] = False
+        return grid
+
+    operations = [('copy', lambda grid, other: grid.copy()),
+                  ('copy + eat', lambda grid, other: eat(grid)),
+                  ('hash', lambda grid, other: hash(grid)),
+                  ('count', lambda grid, other: grid.count()),
+                  ('asList', lambda grid, other: grid.asList()),
+                  ('== copy', lambda grid, other: grid == other),
+                  ('read', lambda grid, other: grid[x][y])]
+    print('%s food, %d runs of each operation' % (layoutName, repeat))
+    print('%-12s %12s %12s' % ('Operation', 'Grid (us)', 'BitGrid (us)'))
+    for operation, function in operations:
+        times = []
+        for name, grid in grids:
+            other = grid.copy()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                function(grid, other)
+            times.append((time.perf_counter() - start) / repeat * 1e6)
+        print('%-12s %12.2f %12.2f' % ((operation,) + tuple(times)))
+
+if __name__ == '__main__':
+    print('Copy-on-write: %d steps checked' % checkGridCopies())
+    benchmarkGrids(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
@@ -12,8 +12,8 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
-from util import manhattanDistance
-from game import Grid
+from game import Grid, BitGrid
+from mazeDistances import getDistanceOracle
 import os
 import random
 from functools import reduce
@@ -25,7 +25,8 @@ class Layout:
     A Layout manages the static information about the game board.
     """
 
-    def __init__(self, layoutText):
+    def __init__(self, layoutText, path=None):
+        self.path = path
         self.width = len(layoutText[0])
         self.height= len(layoutText)
         self.walls = Grid(self.width, self.height, False)
@@ -34,13 +35,25 @@ class Layout:
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
+        # The walls never change; the food is copied into every game state, so it is kept as a BitGrid
+        self.food = BitGrid.fromGrid(self.food)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self._distances = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
         return self.numGhosts
 
+    def getDistances(self):
+        """
+        The DistanceOracle of this layout's walls (see mazeDistances.py),
+        built on first use and cached on disk next to the .lay file.
+        """
+        if self._distances is None:
+            self._distances = getDistanceOracle(self.layoutText, self.path)
+        return self._distances
+
     def initializeVisibilityMatrix(self):
         global VISIBILITY_MATRIX_CACHE
         if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
@@ -80,7 +93,8 @@ class Layout:
 
     def getFurthestCorner(self, pacPos):
         poses = [(1,1), (1, self.height - 2), (self.width - 2, 1), (self.width - 2, self.height - 2)]
-        dist, pos = max([(manhattanDistance(p, pacPos), p) for p in poses])
+        distances = self.getDistances()
+        dist, pos = max([(distances.getDistance(p, pacPos), p) for p in poses])
         return pos
 
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
@@ -91,7 +105,14 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        # The walls and the maze distances are static and shared; the text is not parsed again
+        layout = Layout.__new__(Layout)
+        layout.__dict__.update(self.__dict__)
+        layout.food = self.food.copy()
+        layout.capsules = self.capsules[:]
+        layout.agentPositions = self.agentPositions[:]
+        layout.layoutText = self.layoutText[:]
+        return layout
 
     def processLayoutText(self, layoutText):
         """
@@ -146,5 +167,5 @@ def getLayout(name, back = 2):
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)): return None
     f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    try: return Layout([line.strip() for line in f], fullname)
     finally: f.close()
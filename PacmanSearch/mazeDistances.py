@@ -0,0 +1,152 @@
+# mazeDistances.py
+# ----------------
+# True maze distances between every pair of open cells of a layout.
+#
+# Distances only depend on the walls, so they are computed once per wall
+# configuration (one breadth-first search per open cell) and shared by
+# everything that needs them: the search heuristics, the ghosts and
+# Layout.getFurthestCorner. The table is a uint16 matrix indexed by open
+# cell; when the layout was loaded from a .lay file it is also saved next to
+# it as <name>.<key>.npy and memory-mapped by later runs.
+#
+# numpy is only needed to save and map the table; without it the table is
+# built in memory on each run.
+#
+# A process keeps the oracles of its last DISTANCE_ORACLE_CACHE_SIZE wall
+# configurations, so the games of a batch share one table while a process
+# that goes through many layouts does not keep a table for each of them.
+# Every Layout also holds on to its own oracle (Layout.getDistances).
+
+import hashlib
+import os
+import tempfile
+from array import array
+from collections import OrderedDict, deque
+
+from util import manhattanDistance
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UNREACHABLE = 0xFFFF
+
+DISTANCE_ORACLE_CACHE_SIZE = 4
+DISTANCE_ORACLE_CACHE = OrderedDict()
+
+def wallsKey(layoutText):
+    """
+    Hash of the wall cells of a layout text. Food and agents are left out,
+    so every state of a game maps to the same key.
+    """
+    walls = '\n'.join(''.join('%' if char == '%' else ' ' for char in line) for line in layoutText)
+    return hashlib.sha1(walls.encode()).hexdigest()[:16]
+
+def getDistanceOracle(layoutText, path=None):
+    """
+    Returns the shared DistanceOracle for these walls. layoutText is a list
+    of rows, top row first, as in Layout.layoutText; path is the .lay file
+    it was read from, if any.
+    """
+    key = wallsKey(layoutText)
+    cachePath = None
+    if path is not None and numpy is not None:
+        cachePath = '%s.%s.npy' % (os.path.splitext(path)[0], key)
+    oracle = DISTANCE_ORACLE_CACHE.get(key)
+    if oracle is None:
+        oracle = DISTANCE_ORACLE_CACHE[key] = DistanceOracle(layoutText, cachePath)
+        if len(DISTANCE_ORACLE_CACHE) > DISTANCE_ORACLE_CACHE_SIZE:
+            DISTANCE_ORACLE_CACHE.popitem(last=False)
+    else:
+        DISTANCE_ORACLE_CACHE.move_to_end(key)
+        if oracle.cachePath is None and cachePath is not None:
+            # First built for a caller that had no path: save it now that there is one
+            oracle.save(cachePath)
+    return oracle
+
+class DistanceOracle:
+    """
+    O(1) maze distances between positions in the (x, y) convention of the
+    game, with the origin in the bottom left corner.
+    """
+    def __init__(self, layoutText, cachePath=None):
+        height = len(layoutText)
+        self.positions = []
+        for x in range(max(len(line) for line in layoutText)):
+            for y in range(height):
+                line = layoutText[height - 1 - y]
+                if x < len(line) and line[x] != '%':
+                    self.positions.append((x, y))
+        self.index = {position: i for i, position in enumerate(self.positions)}
+        self.rows = {}
+        self.cachePath = None
+        self.matrix = self.loadOrBuild(cachePath)
+
+    def loadOrBuild(self, cachePath):
+        if cachePath is not None and os.path.exists(cachePath):
+            matrix = numpy.load(cachePath, mmap_mode='r')
+            if matrix.shape == (len(self.positions), len(self.positions)):
+                self.cachePath = cachePath
+                return matrix
+
+        rows = [self.bfs(source) for source in range(len(self.positions))]
+        if numpy is None:
+            return rows
+        self.matrix = numpy.array(rows, dtype=numpy.uint16)
+        if cachePath is not None:
+            self.save(cachePath)
+        return self.matrix
+
+    def save(self, cachePath):
+        """
+        Saves the table to cachePath, which later runs map instead of
+        building the table again.
+        """
+        # Several processes may build the same table at once: each writes its own
+        # temporary file, and whichever rename comes last leaves an identical table
+        fd, tempPath = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(cachePath) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                numpy.save(f, numpy.asarray(self.matrix, dtype=numpy.uint16))
+            os.replace(tempPath, cachePath)
+            self.cachePath = cachePath
+        except OSError:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+
+    def bfs(self, source):
+        row = array('H', [UNREACHABLE]) * len(self.positions)
+        row[source] = 0
+        queue = deque([source])
+        while queue:
+            cell = queue.popleft()
+            x, y = self.positions[cell]
+            for neighbour in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                other = self.index.get(neighbour)
+                if other is not None and row[other] == UNREACHABLE:
+                    row[other] = row[cell] + 1
+                    queue.append(other)
+        return row
+
+    def getRow(self, pos):
+        """
+        Distances from pos to every open cell, as a list indexed like
+        self.positions (UNREACHABLE for cells that cannot be reached).
+        """
+        i = self.index[pos]
+        if i not in self.rows:
+            self.rows[i] = self.matrix[i].tolist()
+        return self.rows[i]
+
+    def getDistance(self, pos1, pos2):
+        """
+        Maze distance between two open cells, or float('inf') if there is no
+        path. Positions that are not open cells (walls, or the half-way
+        positions of scared ghosts) fall back to the Manhattan distance.
+        """
+        i, j = self.index.get(pos1), self.index.get(pos2)
+        if i is None or j is None:
+            return manhattanDistance(pos1, pos2)
+        distance = self.matrix[i][j]
+        return float('inf') if distance == UNREACHABLE else int(distance)
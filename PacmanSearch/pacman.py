@@ -47,6 +47,9 @@ from game import Directions
 from game import Actions
 from util import nearestPoint
 from util import manhattanDistance
+from explorationTracker import ExplorationTracker
+from gameResults import ResultAggregator, gameRecord, openResultSink
+from searchStats import export as exportSearchStats
 import util, layout
 import sys, types, time, random, os
 
@@ -73,12 +76,26 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # Exploration tracking is off unless an ExplorationTracker (see explorationTracker.py) is installed here
+    tracker = None
+
+    def trackExploration( tracker ):
+        """
+        Context manager that records every generateSuccessor call with
+        tracker inside the with block:
+
+        with GameState.trackExploration(ExplorationTracker('exact')) as tracker: ...
+        """
+        return _TrackExploration( tracker )
+    trackExploration = staticmethod(trackExploration)
+
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
+        """
+        Fingerprints of the states seen by the installed tracker in 'exact'
+        mode, and resets it. Empty when no exact tracker is installed.
+        """
+        if GameState.tracker == None: return set()
+        return GameState.tracker.reset()
     getAndResetExplored = staticmethod(getAndResetExplored)
 
     def getLegalActions( self, agentIndex=0 ):
@@ -114,7 +131,9 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
         else:
+            state.data.hashAgent( agentIndex )
             GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+            state.data.hashAgent( agentIndex )
 
         # Resolve multi-agent effects
         GhostRules.checkDeath( state, agentIndex )
@@ -122,8 +141,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.tracker != None:
+            GameState.tracker.record(self, state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -176,7 +195,14 @@ class GameState:
         return self.data.capsules
 
     def getNumFood( self ):
-        return self.data.food.count()
+        return self.data.numFood
+
+    def getFoodPositions( self ):
+        """
+        Returns the set of (x,y) positions that still have food. It is
+        shared between states and must not be modified.
+        """
+        return self.data.getFoodPositions()
 
     def getFood(self):
         """
@@ -261,6 +287,22 @@ class GameState:
 # You shouldn't need to look through the code in this section of the file. #
 ############################################################################
 
+class _TrackExploration:
+    """
+    Installs a tracker on GameState for the duration of a with block.
+    """
+    def __init__( self, tracker ):
+        self.tracker = tracker
+
+    def __enter__( self ):
+        self.previous = GameState.tracker
+        GameState.tracker = self.tracker
+        return self.tracker
+
+    def __exit__( self, *exc ):
+        GameState.tracker = self.previous
+        return False
+
 SCARED_TIME = 40    # Moves ghosts are scared
 COLLISION_TOLERANCE = 0.7 # How close ghosts must be to Pacman to kill
 TIME_PENALTY = 1 # Number of points lost each round
@@ -323,6 +365,24 @@ class ClassicGameRules:
     def getMaxTimeWarnings(self, agentIndex):
         return 0
 
+class BatchGameRules(ClassicGameRules):
+    """
+    Rules for headless batch games: a win ends the game, as a loss does, and
+    a game is cut off after maxMoves moves of all agents (0 for no limit).
+    """
+    def __init__(self, timeout=30, maxMoves=0):
+        ClassicGameRules.__init__(self, timeout)
+        self.maxMoves = maxMoves
+
+    def process(self, state, game):
+        ClassicGameRules.process(self, state, game)
+        if self.maxMoves and len(game.moveHistory) >= self.maxMoves:
+            game.gameOver = True
+
+    def win( self, state, game ):
+        ClassicGameRules.win(self, state, game)
+        game.gameOver = True
+
 class PacmanRules:
     """
     These functions govern how pacman interacts with his environment under
@@ -349,7 +409,9 @@ class PacmanRules:
 
         # Update Configuration
         vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
+        state.data.hashAgent( 0 )
         pacmanState.configuration = pacmanState.configuration.generateSuccessor( vector )
+        state.data.hashAgent( 0 )
 
         # Eat
         next = pacmanState.configuration.getPosition()
@@ -364,21 +426,21 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.eatFood(x, y)
             state.data._foodEaten = position
-            # TODO: cache numFood?
-            numFood = state.getNumFood()
-            if numFood == 0 and not state.data._lose:
+            if state.data.numFood == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
         if( position in state.getCapsules() ):
             state.data.capsules.remove( position )
+            state.data.hashCapsule( position )
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
+                state.data.hashAgent( index )
                 state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.hashAgent( index )
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -411,7 +473,9 @@ class GhostRules:
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
         vector = Actions.directionToVector( action, speed )
+        state.data.hashAgent( ghostIndex )
         ghostState.configuration = ghostState.configuration.generateSuccessor( vector )
+        state.data.hashAgent( ghostIndex )
     applyAction = staticmethod( applyAction )
 
     def decrementTimer( ghostState):
@@ -439,8 +503,10 @@ class GhostRules:
     def collide( state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
+            state.data.hashAgent( agentIndex )
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
+            state.data.hashAgent( agentIndex )
             # Added for first-person
             state.data._eaten[agentIndex] = True
         else:
@@ -526,15 +592,50 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--workers', dest='workers', type='int',
+                      help=default('Play the games headless in a batch over this many processes (0: play them one by one)'),
+                      metavar='N', default=0)
+    parser.add_option('--maxMoves', dest='maxMoves', type='int',
+                      help=default('In batch mode, end a game after this many moves of all agents (0: no limit)'),
+                      default=3000)
+    parser.add_option('--results', dest='results',
+                      help='Stream a record of every game to FILE as it ends (CSV for .csv, JSON lines otherwise)',
+                      metavar='FILE', default=None)
+    parser.add_option('--searchStats', dest='searchStats',
+                      help='Write the statistics of every search of the Pacman agent to FILE (CSV for .csv, JSON otherwise)',
+                      metavar='FILE', default=None)
+    parser.add_option('--trackExploration', dest='trackExploration', type='choice', choices=['count', 'exact', 'bloom'],
+                      help='Track the states generated in each game: count, exact or bloom (see explorationTracker.py)',
+                      metavar='MODE', default=None)
+    parser.add_option('--explorationSampleRate', dest='explorationSampleRate', type='float',
+                      help=default('Fraction of the states fingerprinted by --trackExploration'), default=1.0)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
         raise Exception('Command line input not understood: ' + str(otherjunk))
     args = dict()
 
+    if options.workers > 0:
+        # Batch games are headless and fresh agents play each of them
+        for enabled, option in ((options.numTraining > 0, '--numTraining'), (options.record, '--recordActions'),
+                                (options.gameToReplay != None, '--replay')):
+            if enabled: parser.error('%s cannot be used with --workers' % option)
+
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
 
+    if options.workers > 0:
+        # Batch mode: every worker builds its own agents from these, and game i is seeded with '<seed>-<i>'
+        options.quietGraphics = True
+        args['batch'] = dict(layoutName=options.layout, pacmanType=options.pacman,
+                             agentArgs=parseAgentArgs(options.agentArgs), ghostType=options.ghost,
+                             numGhosts=options.numGhosts, numGames=options.numGames, workers=options.workers,
+                             seed='cs188' if options.fixRandomSeed else str(random.getrandbits(64)),
+                             timeout=options.timeout, maxMoves=options.maxMoves,
+                             trackExploration=options.trackExploration,
+                             explorationSampleRate=options.explorationSampleRate,
+                             searchStatsPath=options.searchStats)
+
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
@@ -573,6 +674,11 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['trackExploration'] = options.trackExploration
+    args['explorationSampleRate'] = options.explorationSampleRate
+    args['searchStatsPath'] = options.searchStats
+    # Nothing uses the finished games when run from the command line, so they are not kept
+    args['keepGames'] = False
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -585,6 +691,10 @@ def readCommand( argv ):
         replayGame(**recorded)
         sys.exit(0)
 
+    # Opened last, so that nothing above leaves an empty file behind
+    args['resultSinks'] = [openResultSink(options.results)] if options.results else []
+    if 'batch' in args: args['batch']['resultSinks'] = args['resultSinks']
+
     return args
 
 def loadAgent(pacman, nographics):
@@ -628,12 +738,25 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30,
+              trackExploration=None, explorationSampleRate=1.0, resultSinks=(), keepGames=True,
+              searchStatsPath=None ):
+    """
+    Plays numGames games one after the other. Every game that is not a
+    training game is turned into a record (see gameResults.py) for the
+    resultSinks and the running statistics printed at the end; the Game
+    objects are returned too, unless keepGames is False. The statistics of
+    the Pacman agent's searches are written to searchStatsPath, if given.
+    """
     import __main__
     __main__.__dict__['_display'] = display
 
     rules = ClassicGameRules(timeout)
     games = []
+    aggregator = ResultAggregator()
+    sinks = [aggregator] + list(resultSinks)
+    searchStats = []
+    if searchStatsPath != None: collectSearchStats(pacman)
 
     for i in range( numGames ):
         beQuiet = i < numTraining
@@ -646,8 +769,20 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
             gameDisplay = display
             rules.quiet = False
         game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
-        if not beQuiet: games.append(game)
+        game.exploration = None
+        if trackExploration != None:
+            game.exploration = ExplorationTracker(trackExploration, explorationSampleRate)
+        with GameState.trackExploration(game.exploration):
+            game.run()
+        if game.exploration != None and not beQuiet: print('Exploration:', game.exploration)
+        gameSearchStats = takeSearchStats(pacman, i) if searchStatsPath != None else []
+        if not beQuiet:
+            searchStats.extend(gameSearchStats)
+            result = gameRecord(i, game)
+            if game.exploration != None: result['uniqueStates'] = game.exploration.uniqueStates()
+            for sink in sinks:
+                sink.add(result)
+            if keepGames: games.append(game)
 
         if record:
             import time, pickle
@@ -657,17 +792,150 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
             pickle.dump(components, f)
             f.close()
 
+    for sink in sinks:
+        sink.close()
+    if searchStatsPath != None:
+        exportSearchStats(searchStats, searchStatsPath)
     if (numGames-numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        # print('Average Score:', sum(scores) / float(len(scores)))
-        # print('Scores:       ', ', '.join([str(score) for score in scores]))
-        # print('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
-        # print('Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins]))
+        print(aggregator.summary())
 
     return games
 
+def collectSearchStats( agent ):
+    """
+    Turns on the SearchStats of the agent's searches, for the agents that
+    keep them (see searchAgents.SearchAgent). Off by default, so games run
+    without --searchStats keep nothing.
+    """
+    if getattr(agent, 'searchStats', []) == None:
+        agent.searchStats = []
+
+def takeSearchStats( agent, index ):
+    """
+    The SearchStats an agent collected (see searchAgents.SearchAgent) during
+    game index, as export rows labelled with the game. The agent's list is
+    emptied, so nothing piles up over the games.
+    """
+    stats = getattr(agent, 'searchStats', None)
+    if not stats: return []
+    rows = []
+    for searchStats in stats:
+        searchStats.labels['game'] = index
+        rows.append(searchStats.as_dict())
+    del stats[:]
+    return rows
+
+######################
+# HEADLESS BATCH RUN #
+######################
+
+# Layout, agent classes and rules of a batch worker process, set up once by _initBatchWorker
+_BATCH_WORKER = None
+
+def _initBatchWorker( layoutName, pacmanType, agentArgs, ghostType, numGhosts, timeout, maxMoves,
+                      trackExploration, explorationSampleRate, keepSearchStats ):
+    global _BATCH_WORKER
+    _BATCH_WORKER = (layout.getLayout( layoutName ), loadAgent(pacmanType, True), agentArgs,
+                     loadAgent(ghostType, True), numGhosts, BatchGameRules(timeout, maxMoves),
+                     trackExploration, explorationSampleRate, keepSearchStats)
+
+def _playBatchGame( job ):
+    """
+    Plays one game in a worker and returns its record; the Game itself is
+    dropped. The agents are built anew for every game, since some of them
+    (SearchAgent's plan, for one) keep state from the game they played.
+    """
+    import textDisplay
+    index, seed = job
+    (board, pacmanClass, agentArgs, ghostClass, numGhosts, rules, trackExploration,
+     explorationSampleRate, keepSearchStats) = _BATCH_WORKER
+    random.seed(seed)
+    pacman = pacmanClass(**agentArgs)
+    if keepSearchStats: collectSearchStats(pacman)
+    ghosts = [ghostClass( i+1 ) for i in range( numGhosts )]
+    rules.quiet = True
+    game = rules.newGame( board, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions=True )
+    game.muteAgents = True
+    tracker = None
+    if trackExploration != None:
+        tracker = ExplorationTracker(trackExploration, explorationSampleRate)
+    startTime = time.perf_counter()
+    with GameState.trackExploration(tracker):
+        game.run()
+    result = gameRecord(index, game, seed)
+    result['gameTime'] = time.perf_counter() - startTime
+    if tracker != None:
+        result['uniqueStates'] = tracker.uniqueStates()
+    if keepSearchStats:
+        # Taken off the record by runBatch before it reaches the sinks
+        result['searchStats'] = takeSearchStats(pacman, index)
+    return result
+
+def runBatch( layoutName, pacmanType, agentArgs, ghostType, numGames, workers, seed, numGhosts=4, timeout=30,
+              maxMoves=3000, trackExploration=None, explorationSampleRate=1.0, resultSinks=(), onResult=None,
+              searchStatsPath=None ):
+    """
+    Plays numGames headless games over a pool of worker processes. Every
+    record goes to onResult (by default a line is printed) and to the
+    resultSinks as soon as its game is over, in finishing order. Game i is
+    seeded with '<seed>-<i>', so the records do not depend on the number of
+    workers. The statistics of the Pacman agents' searches are written to
+    searchStatsPath, if given. Returns the ResultAggregator of the batch.
+    """
+    import multiprocessing
+    if onResult == None: onResult = _printBatchResult
+    workerArgs = (layoutName, pacmanType, agentArgs, ghostType, numGhosts, timeout, maxMoves,
+                  trackExploration, explorationSampleRate, searchStatsPath != None)
+    jobs = [(i, '%s-%d' % (seed, i)) for i in range(numGames)]
+    aggregator = ResultAggregator()
+    sinks = [aggregator] + list(resultSinks)
+    # Build the maze distances before forking so the workers share them
+    layout.getLayout( layoutName ).getDistances()
+    startTime = time.perf_counter()
+    totals = {'moves': 0, 'gameTime': 0.0}
+    searchStats = []
+
+    def add( result ):
+        searchStats.extend(result.pop('searchStats', ()))
+        totals['moves'] += result['moves']
+        totals['gameTime'] += result['gameTime']
+        onResult(result)
+        for sink in sinks:
+            sink.add(result)
+
+    if workers == 1:
+        _initBatchWorker(*workerArgs)
+        for job in jobs:
+            add(_playBatchGame(job))
+    else:
+        pool = multiprocessing.Pool(workers, _initBatchWorker, workerArgs)
+        try:
+            # One game per task, so every record reaches the sinks as soon as its game is over
+            for result in pool.imap_unordered(_playBatchGame, jobs, chunksize=1):
+                add(result)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    for sink in sinks:
+        sink.close()
+    if searchStatsPath != None:
+        exportSearchStats(sorted(searchStats, key=lambda row: row['game']), searchStatsPath)
+    seconds = time.perf_counter() - startTime
+    if aggregator.games:
+        print(aggregator.summary())
+        print('Games/second:  %.1f' % (aggregator.games / seconds))
+        if totals['moves']:
+            # Game.run time of every move, agents included, summed over the workers
+            print('Time per move: %.1f us' % (totals['gameTime'] / totals['moves'] * 1e6))
+    return aggregator
+
+def _printBatchResult( result ):
+    outcome = 'Win' if result['win'] else 'Crash' if result['crashed'] else 'Cut off' if result['cutOff'] else 'Loss'
+    print('Game %d: %s, score %d, %d moves, %.3fs agent time' %
+          (result['game'], outcome, result['score'], result['moves'], result['agentTime']))
+    sys.stdout.flush()
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
@@ -680,7 +948,10 @@ if __name__ == '__main__':
     > python pacman.py --help
     """
     args = readCommand( sys.argv[1:] ) # Get game components based on input
-    runGames( **args )
+    if 'batch' in args:
+        runBatch( **args['batch'] )
+    else:
+        runGames( **args )
 
     # import cProfile
     # cProfile.run("runGames( **args )")
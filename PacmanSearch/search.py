@@ -4,41 +4,139 @@ Implement a class representing the problem
 '''
 import util
 import math
+import sys
+import time
+from array import array
+from searchStats import SearchStats, export as export_stats
+
+INFINITY = float('inf')
+class WallTables:
+    # Everything in a problem that only depends on the walls: the wall rows from the top ('%' for a wall, ' ' for
+    # an open cell), the width used for cell indices, and the legal actions of every cell with the cell each one
+    # leads to, in the order West, East, North, South. The walls never change during a game, so the tables are
+    # built once per wall layout and shared by every problem on it
+    cache = {}
+
+    def __init__(self, rows):
+        self.layout = [list(row) for row in rows]
+        self.height = len(self.layout)
+        self.width = max(len(row) for row in self.layout)
+        self.moves = [[] for _ in range(self.height * self.width)]
+        for row_idx, row in enumerate(self.layout):
+            for col_idx, char in enumerate(row):
+                if char == '%':
+                    continue
+                for action, (d_row, d_col) in (('West', (0, -1)), ('East', (0, 1)), ('North', (-1, 0)),
+                                               ('South', (1, 0))):
+                    if self.is_open(row_idx + d_row, col_idx + d_col):
+                        self.moves[row_idx * self.width + col_idx].append(
+                            (action, (row_idx + d_row) * self.width + col_idx + d_col))
+        # The same moves by direction (West, East, North, South), with -1 for a wall, for jump point search
+        self.neighbours = [[-1] * 4 for _ in self.moves]
+        for cell, moves in enumerate(self.moves):
+            for action, next_cell in moves:
+                self.neighbours[cell][ACTION_CODES[action]] = next_cell
+        # Cells that are not in the middle of a corridor: dead ends, junctions and open areas
+        self.junctions = set(cell for cell, moves in enumerate(self.moves) if moves and len(moves) != 2)
+
+    def is_open(self, row, col):
+        return 0 <= row < self.height and 0 <= col < len(self.layout[row]) and self.layout[row][col] != '%'
+
+    # Tables for layout rows as parsed from text (top row first); only the walls are looked at
+    @classmethod
+    def for_rows(cls, rows):
+        key = tuple(''.join('%' if char == '%' else ' ' for char in row) for row in rows)
+        if key not in cls.cache:
+            cls.cache[key] = cls(key)
+        return cls.cache[key]
+
+    # Tables for a layout.Layout, keyed by its text, which is shared by every copy of the layout in a game
+    @classmethod
+    def for_layout(cls, layout):
+        key = tuple(layout.layoutText)
+        if key not in cls.cache:
+            walls = layout.walls
+            rows = [''.join('%' if walls[x][walls.height - 1 - row_idx] else ' ' for x in range(walls.width))
+                    for row_idx in range(walls.height)]
+            cls.cache[key] = cls.for_rows(rows)
+        return cls.cache[key]
+
+
 class PacmanProblem:
     def __init__(self, layout_str):
-        self.layout, self.pacman_position, self.food_positions, self.corners = self.parse_layout_from_string(layout_str)
+        layout, self.pacman_position, self.food_positions, self.corners = self.parse_layout_from_string(layout_str)
+        self.use_wall_tables(WallTables.for_rows(layout))
+        self.build_state_encoding()
+        self.distance_oracle = None
+
+    def use_wall_tables(self, tables):
+        self.wall_tables = tables
+        self.layout = tables.layout
+        self.width = tables.width
+        self.moves = tables.moves
+
+    # Canonical state encoding: a state is (cell index, bitmask of the food still left), where the cell index
+    # is row * width + col and food_positions[i] is bit i. Both are small ints, so states hash cheaply and
+    # states that only differ in the order the food was eaten are the same state.
+    # (The corners are layout walls and can never be visited, so they are not part of the state.)
+    def build_state_encoding(self):
+        self.food_bit = [0] * len(self.moves)
+        for bit, (row, col) in enumerate(self.food_positions):
+            self.food_bit[self.cell_index((row, col))] = 1 << bit
+        self.all_food = (1 << len(self.food_positions)) - 1
+
+    def is_open(self, row, col):
+        return self.wall_tables.is_open(row, col)
+
+    def cell_index(self, position):
+        return position[0] * self.width + position[1]
+
+    def cell_position(self, index):
+        return divmod(index, self.width)
+
+    def remaining_food(self, food_mask):
+        return [food for bit, food in enumerate(self.food_positions) if food_mask >> bit & 1]
 
     def get_start_state(self):
-        return (self.pacman_position, tuple(), tuple(self.corners))
+        start = self.cell_index(self.pacman_position)
+        return (start, self.all_food & ~self.food_bit[start])
 
     def get_actions(self, state):
-        pacman_pos, _, _ = state
-        legal_actions = []
-        if self.layout[pacman_pos[0]][pacman_pos[1] - 1] != '%':
-            legal_actions.append('West')
-        if self.layout[pacman_pos[0]][pacman_pos[1] + 1] != '%':
-            legal_actions.append('East')
-        if self.layout[pacman_pos[0] - 1][pacman_pos[1]] != '%':
-            legal_actions.append('North')
-        if self.layout[pacman_pos[0] + 1][pacman_pos[1]] != '%':
-            legal_actions.append('South')
-        return legal_actions
+        return [action for action, _ in self.moves[state[0]]]
 
     def get_successor(self, state, action):
-        pacman_pos, food_collected, corners_visited = state
-        new_pacman_pos = self.calculate_new_position(pacman_pos, action)
-        if new_pacman_pos in self.food_positions:
-            food_collected += (new_pacman_pos,)
-        if new_pacman_pos in self.corners:
-            corners_visited += (new_pacman_pos,)
-        return (new_pacman_pos, food_collected, corners_visited)
+        index, food_mask = state
+        for move, new_index in self.moves[index]:
+            if move == action:
+                return (new_index, food_mask & ~self.food_bit[new_index])
+        return state
+
+    # Build the problem straight from a GameState: the walls come from the shared WallTables of its layout, the
+    # food from the food grid and Pacman from its configuration, with no text rendering or parsing.
+    # Food is numbered from the top row down, so the problem is the same as PacmanProblem(str(state))
+    @classmethod
+    def from_game_state(cls, state):
+        problem = cls.__new__(cls)
+        problem.use_wall_tables(WallTables.for_layout(state.data.layout))
+        height = problem.wall_tables.height
+        problem.food_positions = sorted((height - 1 - y, x) for x, y in state.getFood().asList())
+        pacman_x, pacman_y = state.getPacmanPosition()
+        problem.pacman_position = (height - 1 - int(pacman_y), int(pacman_x))
+        problem.corners = [(0, 0), (0, problem.width - 1), (height - 1, 0), (height - 1, problem.width - 1)]
+        problem.distance_oracle = state.data.layout.getDistances()
+        problem.build_state_encoding()
+        return problem
 
     def get_cost_of_actions(self, actions):
         # If every action has a cost of 1, then the total cost is just the number of actions
         return len(actions)
 
+    def get_step_cost(self, state, action):
+        # Cost of one action, consistent with get_cost_of_actions
+        return 1
+
     def is_goal_state(self, state):
-        return len(state[1]) == len(self.food_positions) and len(state[2]) == len(self.corners)
+        return state[1] == 0
 
     def parse_layout_from_string(self, layout_str):
         layout = []
@@ -78,35 +176,222 @@ class PacmanProblem:
         return current_pos
 
 
+'''
+Search node store
+'''
+ACTIONS = ('West', 'East', 'North', 'South')
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+class SearchNodes:
+    # Every generated node is an index into parallel arrays holding its parent, the action that led to it and
+    # its path cost, so a successor costs three array appends instead of a copy of the whole action list.
+    # The root has parent -1, and the action list is only rebuilt for the goal.
+    # An action can also be a tuple of steps (an edge of a CorridorProblem or JumpPointProblem); such actions are
+    # numbered as they are first seen, and path() expands them back into single steps
+    def __init__(self):
+        self.parents = array('l')
+        self.actions = array('l')
+        self.costs = array('d')
+        self.action_codes = dict(ACTION_CODES)
+        self.action_steps = [(action,) for action in ACTIONS]
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self, parent, action, cost):
+        self.parents.append(parent)
+        if action is None:
+            code = -1
+        else:
+            code = self.action_codes.get(action)
+            if code is None:
+                code = self.action_codes[action] = len(self.action_steps)
+                self.action_steps.append(tuple(action))
+        self.actions.append(code)
+        self.costs.append(cost)
+        return len(self.parents) - 1
+
+    def path(self, node):
+        actions = []
+        while self.parents[node] != -1:
+            actions.extend(reversed(self.action_steps[self.actions[node]]))
+            node = self.parents[node]
+        actions.reverse()
+        return actions
+
+
+'''
+Compressed search graphs
+'''
+class CompressedProblem:
+    # Common part of CorridorProblem and JumpPointProblem: a PacmanProblem seen through a smaller graph whose
+    # actions are tuples of steps, costing one per step. Everything else (cell_position, remaining_food, layout,
+    # moves, ...) is read from the wrapped problem, so the heuristics work unchanged
+    def __init__(self, problem):
+        self.problem = problem
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+    def get_cost_of_actions(self, actions):
+        return sum(len(steps) for steps in actions)
+
+    def get_step_cost(self, state, action):
+        return len(action)
+
+
+class CorridorProblem(CompressedProblem):
+    # The mazes are mostly corridors one cell wide, and the only place a shortest plan can turn around or branch
+    # is a junction, a dead end, a food dot or the start. Those cells are the nodes; the corridor between two
+    # nodes is a single action whose steps are the moves along it. No corridor goes over food, so the state is
+    # (cell index, food bitmask) as in PacmanProblem and the plans are as short.
+    # Edges are walked the first time a node is expanded
+    def __init__(self, problem):
+        CompressedProblem.__init__(self, problem)
+        self.nodes = set(problem.wall_tables.junctions)
+        self.nodes.update(problem.cell_index(food) for food in problem.food_positions)
+        self.nodes.add(problem.cell_index(problem.pacman_position))
+        self.edges = {}
+
+    def get_start_state(self):
+        return self.problem.get_start_state()
+
+    def is_goal_state(self, state):
+        return state[1] == 0
+
+    def corridors(self, node):
+        if node not in self.edges:
+            moves = self.problem.moves
+            edges = []
+            for action, cell in moves[node]:
+                steps = [action]
+                previous = node
+                while cell not in self.nodes:
+                    # A corridor cell has two moves, one of them back
+                    for action, next_cell in moves[cell]:
+                        if next_cell != previous:
+                            break
+                    steps.append(action)
+                    previous, cell = cell, next_cell
+                edges.append((tuple(steps), cell))
+            self.edges[node] = edges
+        return self.edges[node]
+
+    def get_actions(self, state):
+        return [steps for steps, _ in self.corridors(state[0])]
+
+    def get_successor(self, state, action):
+        index, food_mask = state
+        for steps, new_index in self.corridors(index):
+            if steps == action:
+                return (new_index, food_mask & ~self.problem.food_bit[new_index])
+        return state
+
+
+class JumpPointProblem(CompressedProblem):
+    # Jump point search for the 4-connected grid (Harabor & Grastien, 2011, without diagonal moves). Among the
+    # many equally short paths through an open area, only the ones that go vertically first are searched: from
+    # a cell reached by a horizontal move the search carries on or turns vertically, from a vertical move it
+    # carries on or turns horizontally, and each of these moves jumps in a straight line until a cell where the
+    # search has to branch, i.e. a food dot, a cell whose side opens behind a wall (a forced neighbour), or, for
+    # vertical jumps, a cell from which a horizontal jump finds one of those.
+    # A state is (cell index, food bitmask, direction of the last jump). Eating a dot is like starting a new
+    # search there, so the direction is reset to None and every direction is tried again
+    VERTICAL = (ACTION_CODES['North'], ACTION_CODES['South'])
+    HORIZONTAL = (ACTION_CODES['West'], ACTION_CODES['East'])
+
+    def __init__(self, problem):
+        CompressedProblem.__init__(self, problem)
+        self.neighbours = problem.wall_tables.neighbours
+        # get_actions and get_successor are called in a row for the same state, so its jumps are kept
+        self.last_state = self.last_jumps = None
+
+    def get_start_state(self):
+        index, food_mask = self.problem.get_start_state()
+        return (index, food_mask, None)
+
+    def is_goal_state(self, state):
+        return state[1] == 0
+
+    def directions(self, direction):
+        if direction is None:
+            return range(4)
+        if direction in self.HORIZONTAL:
+            return (direction,) + self.VERTICAL
+        return (direction,) + self.HORIZONTAL
+
+    # Cell where a jump from `cell` in `direction` stops and the number of steps to it, or None if it runs into
+    # a wall first
+    def jump(self, cell, direction, food_mask):
+        neighbours, food_bit = self.neighbours, self.problem.food_bit
+        sides = self.VERTICAL if direction in self.HORIZONTAL else self.HORIZONTAL
+        previous, cell = cell, neighbours[cell][direction]
+        distance = 1
+        while cell != -1:
+            if food_bit[cell] & food_mask:
+                return cell, distance
+            for side in sides:
+                if neighbours[cell][side] != -1 and neighbours[previous][side] == -1:
+                    return cell, distance
+            if direction in self.VERTICAL:
+                for side in sides:
+                    if self.jump(cell, side, food_mask) is not None:
+                        return cell, distance
+            previous, cell = cell, neighbours[cell][direction]
+            distance += 1
+        return None
+
+    def get_actions(self, state):
+        return [steps for steps, _ in self.jumps(state)]
+
+    def jumps(self, state):
+        if state == self.last_state:
+            return self.last_jumps
+        index, food_mask, direction = state
+        jumps = []
+        for new_direction in self.directions(direction):
+            jump_point = self.jump(index, new_direction, food_mask)
+            if jump_point is not None:
+                new_index, distance = jump_point
+                jumps.append(((ACTIONS[new_direction],) * distance, (new_index, new_direction)))
+        self.last_state, self.last_jumps = state, jumps
+        return jumps
+
+    def get_successor(self, state, action):
+        food_bit = self.problem.food_bit
+        for steps, (new_index, new_direction) in self.jumps(state):
+            if steps == action:
+                if food_bit[new_index] & state[1]:
+                    return (new_index, state[1] & ~food_bit[new_index], None)
+                return (new_index, state[1], new_direction)
+        return state
+
+
+# Graphs accepted by search_graph() and the agents: 'grid' searches cell by cell
+SEARCH_GRAPHS = {
+    'grid': None,
+    'corridors': CorridorProblem,
+    'jump_points': JumpPointProblem,
+}
+
+
+def search_graph(problem, graph='grid'):
+    if graph not in SEARCH_GRAPHS:
+        raise ValueError("Unknown search graph: " + str(graph))
+    return problem if SEARCH_GRAPHS[graph] is None else SEARCH_GRAPHS[graph](problem)
+
+
 '''
 # TODO 02: Search strategies
 Implement a class with methods as search strategies
 '''
 class SearchStrategies:
-    def simplify_actions(self, actions):
-        simplified_actions = []
-        i = 0
-        while i < len(actions):
-            if i + 1 < len(actions):
-                current_action = actions[i]
-                next_action = actions[i + 1]
-                # Check for opposite actions
-                if (current_action == 'East' and next_action == 'West') or (
-                        current_action == 'West' and next_action == 'East') or (
-                        current_action == 'North' and next_action == 'South') or (
-                        current_action == 'South' and next_action == 'North'):
-                    i += 2  # Skip the next action
-                    continue
-            simplified_actions.append(actions[i])
-            i += 1
-        return simplified_actions
-
     def EuclidDistanceHeuristic(self, state, problem):
-        pacman_position, food_collected, corners_visited = state  # Adjusted to unpack all three elements
-        food_positions = problem.food_positions  # Assuming you want to compare to all food positions
+        pacman_index, food_mask = state[0], state[1]
+        pacman_position = problem.cell_position(pacman_index)
 
-        # Exclude food that's already been collected if that's what you intend
-        remaining_food_positions = [food for food in food_positions if food not in food_collected]
+        # Only the food that has not been eaten yet
+        remaining_food_positions = problem.remaining_food(food_mask)
 
         if not remaining_food_positions:
             return 0
@@ -121,11 +406,11 @@ class SearchStrategies:
         return min(distances)
 
     def ManhattanDistanceHeuristic(self, state, problem):
-        pacman_position, food_collected, _ = state  # No need to unpack corners_visited for Manhattan distance
-        food_positions = problem.food_positions  # Assuming you want to compare to all food positions
+        pacman_index, food_mask = state[0], state[1]
+        pacman_position = problem.cell_position(pacman_index)
 
-        # Exclude food that's already been collected if that's what you intend
-        remaining_food_positions = [food for food in food_positions if food not in food_collected]
+        # Only the food that has not been eaten yet
+        remaining_food_positions = problem.remaining_food(food_mask)
 
         if not remaining_food_positions:
             return 0
@@ -139,68 +424,261 @@ class SearchStrategies:
         # Return the minimum distance to the closest food dot
         return min(distances)
 
-    def a_star_search(self, problem, heuristic=None):
+    # Search statistics: `stats` is a SearchStats (see searchStats.py) or a dict and
+    # receives the counters and phase times once the search is over; None disables them
+    def record_stats(self, stats, search_start, reconstruct_start, **counts):
+        if stats is not None:
+            stats.update(phases={'search': reconstruct_start - search_start,
+                                 'reconstruct': time.perf_counter() - reconstruct_start}, **counts)
+
+    def a_star_search(self, problem, heuristic=None, stats=None):
+        search_start = time.perf_counter()
         if heuristic is None:
             heuristic = self.EuclidDistanceHeuristic
         frontier = util.PriorityQueue()
         explored = set()
+        nodes = SearchNodes()
+        expanded = generated = duplicates = 0
+        max_frontier = 1
 
         # Add the initial state to the frontier with a priority of zero
         initial_state = problem.get_start_state()
         # Pass both the state and the problem to the heuristic function
-        frontier.push((initial_state, []), heuristic(initial_state, problem))
+        frontier.push((initial_state, nodes.add(-1, None, 0)), heuristic(initial_state, problem))
 
         while not frontier.isEmpty():
-            current_state, actions = frontier.pop()
+            max_frontier = max(max_frontier, len(frontier.heap))
+            current_state, node = frontier.pop()
 
             if problem.is_goal_state(current_state):
-                return self.simplify_actions(actions)
+                reconstruct_start = time.perf_counter()
+                # The plan is optimal for the canonical state, so a step into a dead end and back is there to eat
+                # the food at its end and must not be simplified away
+                plan = nodes.path(node)
+                self.record_stats(stats, search_start, reconstruct_start, expanded=expanded, generated=generated,
+                                  duplicates=duplicates, max_frontier=max_frontier, peak_nodes=max_frontier + len(explored),
+                                  solution_length=len(plan))
+                return plan
 
             if current_state not in explored:
                 explored.add(current_state)
+                expanded += 1
 
+                cost = nodes.costs[node]
                 for action in problem.get_actions(current_state):
+                    generated += 1
                     successor = problem.get_successor(current_state, action)
-                    new_actions = actions + [action]
+                    new_cost = cost + problem.get_step_cost(current_state, action)
                     # Unlike BFS, in A* the priority is the current cost plus the heuristic estimate
                     # Again, pass both the successor state and the problem to the heuristic function
-                    priority = problem.get_cost_of_actions(new_actions) + heuristic(successor, problem)
-                    frontier.push((successor, new_actions), priority)
+                    priority = new_cost + heuristic(successor, problem)
+                    frontier.push((successor, nodes.add(node, action, new_cost)), priority)
+            else:
+                duplicates += 1
 
+        self.record_stats(stats, search_start, time.perf_counter(), expanded=expanded, generated=generated,
+                          duplicates=duplicates, max_frontier=max_frontier, peak_nodes=max_frontier + len(explored))
         return []
 
-    def ucs_search(self, problem):
-        frontier = util.PriorityQueue()
+    # `frontier` is an empty queue with push/pop/isEmpty/update; by default an indexed heap keyed by state,
+    # so lowering the cost of a state already on the frontier is O(log n)
+    def ucs_search(self, problem, stats=None, frontier=None):
+        search_start = time.perf_counter()
+        if frontier is None:
+            frontier = util.IndexedPriorityQueue(keyFunction=lambda entry: entry[0])
         explored = set()
+        nodes = SearchNodes()
+        expanded = generated = duplicates = 0
+        max_frontier = 1
 
         # Start with the initial state. The priority is the cost so far, which is 0 for the start state.
         initial_state = problem.get_start_state()
-        frontier.push((initial_state, [], 0), 0)  # (state, actions, cost), priority
+        frontier.push((initial_state, nodes.add(-1, None, 0), 0), 0)  # (state, node, cost), priority
 
         while not frontier.isEmpty():
-            current_state, actions, current_cost = frontier.pop()
+            max_frontier = max(max_frontier, len(frontier.heap))
+            current_state, node, current_cost = frontier.pop()
 
             # Check if we have already explored this state
             if current_state in explored:
+                duplicates += 1
                 continue
 
             # Check if current state is the goal state
             if problem.is_goal_state(current_state):
-                return self.simplify_actions(actions)
+                reconstruct_start = time.perf_counter()
+                plan = nodes.path(node)
+                self.record_stats(stats, search_start, reconstruct_start, expanded=expanded, generated=generated,
+                                  duplicates=duplicates, max_frontier=max_frontier, peak_nodes=max_frontier + len(explored),
+                                  solution_length=len(plan))
+                return plan
 
             explored.add(current_state)
+            expanded += 1
 
+            path_cost = nodes.costs[node]
             for action in problem.get_actions(current_state):
-                successor, cost = problem.get_successor(current_state, action), problem.get_cost_of_actions(
-                    actions + [action])
+                generated += 1
+                # Path cost of the successor, as get_cost_of_actions would give for the extended action list
+                successor, cost = problem.get_successor(current_state, action), path_cost + problem.get_step_cost(
+                    current_state, action)
                 if successor not in explored:
-                    # Add successor to the frontier with the updated cost
-                    new_actions = actions + [action]
-                    new_cost = current_cost + cost
-                    frontier.update((successor, new_actions, new_cost), new_cost)
+                    # Add successor to the frontier with its path cost as the priority
+                    frontier.update((successor, nodes.add(node, action, cost), cost), cost)
+                else:
+                    duplicates += 1
 
+        self.record_stats(stats, search_start, time.perf_counter(), expanded=expanded, generated=generated,
+                          duplicates=duplicates, max_frontier=max_frontier, peak_nodes=max_frontier + len(explored))
         return []
 
+    # A* over the corridor graph and over jump points (see CorridorProblem and JumpPointProblem). The plans are
+    # as short as the ones of a_star_search and come back as single steps, like every other plan
+    def corridor_search(self, problem, heuristic=None, stats=None):
+        return self.a_star_search(CorridorProblem(problem), heuristic, stats)
+
+    def jump_point_search(self, problem, heuristic=None, stats=None):
+        return self.a_star_search(JumpPointProblem(problem), heuristic, stats)
+
+
+'''
+Incremental replanning
+'''
+class DStarLite:
+    # D* Lite (Koenig & Likhachev, 2002) on an undirected graph with unit steps. It searches backwards from a set of
+    # goal vertices, so g(v) is the distance from v to the nearest goal and the start can move freely. Entering a
+    # blocked vertex costs infinity. Between calls to compute_shortest_path the start can move and goals or blocked
+    # vertices can be added and removed; the search tree is kept, and only the vertices whose distance is affected
+    # by a change are expanded again.
+    def __init__(self, neighbours, start, goals, heuristic, blocked=()):
+        self.neighbours = neighbours  # vertex -> adjacent vertices
+        self.heuristic = heuristic  # admissible heuristic(a, b) for the distance between two vertices
+        self.start = self.last_start = start
+        self.km = 0
+        self.goals = set(goals)
+        self.blocked = set(blocked)
+        self.g = {}
+        self.rhs = {}
+        self.queue = util.IndexedPriorityQueue()
+        # Counters over every call to compute_shortest_path, since the search tree is kept between calls
+        self.expanded = 0
+        self.generated = 0
+        self.max_frontier = len(self.goals)
+        for goal in self.goals:
+            self.rhs[goal] = 0
+            self.queue.push(goal, self.key(goal))
+
+    def cost(self, u, v):
+        return INFINITY if v in self.blocked else 1
+
+    def key(self, vertex):
+        best = min(self.g.get(vertex, INFINITY), self.rhs.get(vertex, INFINITY))
+        return (best + self.heuristic(self.start, vertex) + self.km, best)
+
+    def update_vertex(self, vertex):
+        if vertex not in self.goals:
+            self.rhs[vertex] = min([self.cost(vertex, successor) + self.g.get(successor, INFINITY)
+                                    for successor in self.neighbours[vertex]] or [INFINITY])
+        self.queue.remove(vertex)
+        if self.g.get(vertex, INFINITY) != self.rhs.get(vertex, INFINITY):
+            self.queue.push(vertex, self.key(vertex))
+
+    # `stats` (a SearchStats or a dict, as for SearchStrategies) receives the counters so far and the time of
+    # this call, which repeated calls add up
+    def compute_shortest_path(self, stats=None):
+        search_start = time.perf_counter()
+        start = self.start
+        while not self.queue.isEmpty() and (self.queue.peekPriority() < self.key(start) or
+                                            self.rhs.get(start, INFINITY) != self.g.get(start, INFINITY)):
+            self.max_frontier = max(self.max_frontier, len(self.queue.heap))
+            old_key = self.queue.peekPriority()
+            vertex = self.queue.pop()
+            new_key = self.key(vertex)
+            g, rhs = self.g.get(vertex, INFINITY), self.rhs.get(vertex, INFINITY)
+            if old_key < new_key:
+                self.queue.push(vertex, new_key)
+            elif g > rhs:
+                self.expanded += 1
+                self.g[vertex] = rhs
+                for predecessor in self.neighbours[vertex]:
+                    self.generated += 1
+                    self.update_vertex(predecessor)
+            else:
+                self.expanded += 1
+                self.g[vertex] = INFINITY
+                self.update_vertex(vertex)
+                for predecessor in self.neighbours[vertex]:
+                    self.generated += 1
+                    self.update_vertex(predecessor)
+        if stats is not None:
+            stats.update(phases={'search': time.perf_counter() - search_start}, expanded=self.expanded,
+                         generated=self.generated, max_frontier=self.max_frontier,
+                         peak_nodes=len(self.g) + len(self.queue.heap))
+
+    def move_start(self, start):
+        self.km += self.heuristic(self.last_start, start)
+        self.start = self.last_start = start
+
+    def set_goals(self, goals):
+        goals = set(goals)
+        changed = goals ^ self.goals
+        self.goals = goals
+        for vertex in changed:
+            if vertex in goals:
+                self.rhs[vertex] = 0
+            self.update_vertex(vertex)
+
+    def set_blocked(self, blocked):
+        blocked = set(blocked)
+        changed = blocked ^ self.blocked
+        self.blocked = blocked
+        # The cost of every edge into a changed vertex changes
+        for vertex in changed:
+            for predecessor in self.neighbours[vertex]:
+                self.update_vertex(predecessor)
+
+    def distance(self):
+        return self.g.get(self.start, INFINITY)
+
+    # Best neighbour of the start, or None if no goal can be reached
+    def next_step(self):
+        if self.distance() == INFINITY:
+            return None
+        return min(self.neighbours[self.start],
+                   key=lambda successor: self.cost(self.start, successor) + self.g.get(successor, INFINITY))
+
+
+# Time UCS on a layout with the linear-scan PriorityQueue.update and with the indexed queue in both modes
+def benchmark_ucs_queues(layout_file, repeat=20):
+    with open(layout_file, 'r') as file:
+        problem = PacmanProblem(file.read())
+    key = lambda entry: entry[0]
+    queues = [("PriorityQueue (scan)", lambda: util.PriorityQueue()),
+              ("Indexed heap", lambda: util.IndexedPriorityQueue(key)),
+              ("Indexed heap, lazy", lambda: util.IndexedPriorityQueue(key, lazy=True))]
+    print("UCS on %s, %d runs" % (layout_file, repeat))
+    print("%-22s %10s %12s %8s" % ("Queue", "Seconds", "Max frontier", "Cost"))
+    for name, make_queue in queues:
+        stats = {}
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            plan = SearchStrategies().ucs_search(problem, stats, make_queue())
+        print("%-22s %10.3f %12d %8d" % (name, time.perf_counter() - start_time, stats['max_frontier'], len(plan)))
+
+    # The maze frontiers stay small; on a frontier of n states, each update of the scan costs O(n)
+    print()
+    print("%-22s %10s %10s" % ("Queue", "Frontier", "Seconds"))
+    for size in (1000, 4000):
+        for name, make_queue in queues:
+            frontier = make_queue()
+            start_time = time.perf_counter()
+            for state in range(size):
+                frontier.push((state, [], size + state), size + state)
+            for state in range(size):
+                frontier.update((state, [], state), state)
+            while not frontier.isEmpty():
+                frontier.pop()
+            print("%-22s %10d %10.3f" % (name, size, time.perf_counter() - start_time))
 
 
 if __name__ == "__main__":
@@ -212,13 +690,36 @@ if __name__ == "__main__":
 
     searchStratergy = SearchStrategies()
 
-    ucs_result = searchStratergy.ucs_search(pacman_problem)
-    a_star_result = searchStratergy.a_star_search(pacman_problem, None)
+    ucs_stats = SearchStats("ucs", layout=layout_file)
+    a_star_stats = SearchStats("a*", layout=layout_file)
+    ucs_result = searchStratergy.ucs_search(pacman_problem, ucs_stats)
+    a_star_result = searchStratergy.a_star_search(pacman_problem, None, a_star_stats)
 
     print("UCS Result:")
     print("Testing 1 run:", ucs_result)
     print("Total cost:", len(ucs_result))
+    print("Search stats:", ucs_stats)
     print()
     print("A* Result:")
     print("Testing 1 run:", a_star_result)
-    print("Total cost:", len(a_star_result))
\ No newline at end of file
+    print("Total cost:", len(a_star_result))
+    print("Search stats:", a_star_stats)
+
+    all_stats = [ucs_stats, a_star_stats]
+    for name, algorithm, search in (("A* over corridors", "a*-corridors", searchStratergy.corridor_search),
+                                    ("A* over jump points", "a*-jump-points", searchStratergy.jump_point_search)):
+        stats = SearchStats(algorithm, layout=layout_file)
+        result = search(pacman_problem, None, stats)
+        all_stats.append(stats)
+        print()
+        print(name + " Result:")
+        print("Total cost:", len(result))
+        print("Search stats:", stats)
+
+    # --stats FILE writes the statistics of these searches as JSON, or as CSV for a .csv file
+    if "--stats" in sys.argv:
+        export_stats(all_stats, sys.argv[sys.argv.index("--stats") + 1])
+
+    if "--benchmark-queues" in sys.argv:
+        print()
+        benchmark_ucs_queues("layouts/bigMaze.lay")
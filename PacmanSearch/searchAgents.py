@@ -1,7 +1,25 @@
 from game import Directions
 from game import Agent
+from game import Actions
+import inspect
 import random
+import util
+import searchHeuristics
 from search import *
+from searchStats import SearchStats
+
+def takesStats(searchFunction):
+    """
+    Whether searchFunction can be called as searchFunction(problem, stats).
+    """
+    if searchFunction is None:
+        return False
+    try:
+        parameters = inspect.signature(searchFunction).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    positional = [p for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+    return len(positional) >= 2 or any(p.kind == p.VAR_POSITIONAL for p in parameters)
 
 class RandomAgent(Agent):
     def __int__(self):
@@ -22,12 +40,17 @@ the returned action is performed.
 '''
 class SearchAgent(Agent):
 
+    # searchFunction(problem) returns the plan; a searchFunction(problem, stats) also fills stats in. searchStats
+    # is None unless pacman.py --searchStats sets it to a list (see pacman.collectSearchStats); then every search of the
+    # agent adds a SearchStats to it
     def __init__(self, searchFunction=None):
         self.searchFunction = searchFunction
+        self.searchTakesStats = takesStats(searchFunction)
         self.isSearchPerformed = False
         self.actions = []
         self.performedActions = []
         self.boolOneTimePrint = False
+        self.searchStats = None
 
     def printTheResult(self):
         print("List of actions: ")
@@ -35,8 +58,15 @@ class SearchAgent(Agent):
         print("Total cost: ", len(self.performedActions))
 
     def reRunSearch(self, state):
-        problem = PacmanProblem(state.__str__())  # Adjust this to pass whatever the problem needs
-        self.actions = self.searchFunction(problem) if self.searchFunction else []
+        problem = PacmanProblem.from_game_state(state)
+        if not self.searchFunction:
+            self.actions = []
+        elif self.searchStats is not None and self.searchTakesStats:
+            stats = SearchStats(type(self).__name__, food=state.getNumFood())
+            self.actions = self.searchFunction(problem, stats)
+            self.searchStats.append(stats)
+        else:
+            self.actions = self.searchFunction(problem)
         self.isSearchPerformed = True
 
     def getAction(self, state):
@@ -54,13 +84,100 @@ class SearchAgent(Agent):
         return nextAction
 
 class UCSAgent(SearchAgent):
-    def __init__(self):
-        super().__init__(searchFunction=SearchStrategies().ucs_search)
+    # graph is "grid", "corridors" or "jump_points" (see search.SEARCH_GRAPHS)
+    def __init__(self, graph = "grid"):
+        super().__init__(searchFunction=lambda problem, stats=None: SearchStrategies().ucs_search(
+            search_graph(problem, graph), stats))
 
 class AStarAgent(SearchAgent):
-    def __init__(self, heuristic = "Manhattan"):
+    # heuristic is "Euclid", "Manhattan", or one of the maze distance heuristics of searchHeuristics:
+    # "MazeDistance", "MST" or "FarthestPair"; graph is "grid", "corridors" or "jump_points"
+    def __init__(self, heuristic = "Manhattan", graph = "grid"):
         if heuristic == None or heuristic == "Euclid":
             self.heuristic = SearchStrategies().EuclidDistanceHeuristic
         elif heuristic == "Manhattan":
             self.heuristic = SearchStrategies().ManhattanDistanceHeuristic
-        super().__init__(searchFunction=lambda problem: SearchStrategies().a_star_search(problem, self.heuristic))
+        else:
+            self.heuristic = searchHeuristics.get_heuristic(heuristic)
+        super().__init__(searchFunction=lambda problem, stats=None: SearchStrategies().a_star_search(
+            search_graph(problem, graph), self.heuristic, stats))
+
+'''
+Incremental planner
+For each game step, D* Lite repairs the paths towards the nearest food left, treating the cells within ghostRadius
+steps of a ghost that is not scared as blocked. The search tree is kept between steps, so only the part affected
+by Pacman's move, the eaten food and the ghost moves is searched again.
+'''
+class DStarLiteAgent(SearchAgent):
+    def __init__(self, ghostRadius=1):
+        super().__init__()
+        self.ghostRadius = int(ghostRadius)
+        self.planner = None
+        self.gameStats = None
+
+    def registerInitialState(self, state):
+        # New game: the walls may differ, so start from an empty search tree. The planner is kept for the whole
+        # game, so the game has a single SearchStats that every step adds to
+        self.planner = None
+        self.performedActions = []
+        self.boolOneTimePrint = False
+        self.gameStats = None
+        if self.searchStats is not None:
+            self.gameStats = SearchStats(type(self).__name__, food=state.getNumFood())
+            self.searchStats.append(self.gameStats)
+
+    def printTheResult(self):
+        super().printTheResult()
+        if self.planner is not None:
+            print("Nodes expanded by D* Lite: ", self.planner.expanded)
+
+    def buildGraph(self, walls):
+        self.neighbours = {}
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if not walls[x][y]:
+                    self.neighbours[(x, y)] = [(x + dx, y + dy) for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))
+                                               if not walls[x + dx][y + dy]]
+
+    def dangerCells(self, state):
+        blocked = set()
+        for ghost in state.getGhostStates():
+            if ghost.scaredTimer > 0:
+                continue
+            x, y = ghost.getPosition()
+            frontier = [(int(x), int(y))]
+            blocked.update(frontier)
+            for _ in range(self.ghostRadius):
+                frontier = [cell for current in frontier for cell in self.neighbours.get(current, ())
+                            if cell not in blocked]
+                blocked.update(frontier)
+        return blocked
+
+    def getAction(self, state):
+        if state.getNumFood() == 0:
+            if self.boolOneTimePrint is False:
+                self.printTheResult()
+                self.boolOneTimePrint = True
+            return Directions.STOP
+
+        position = state.getPacmanPosition()
+        food = state.getFood().asList()
+        if self.planner is None:
+            self.buildGraph(state.getWalls())
+            self.planner = DStarLite(self.neighbours, position, food, util.manhattanDistance, self.dangerCells(state))
+        else:
+            self.planner.move_start(position)
+            self.planner.set_goals(food)
+            self.planner.set_blocked(self.dangerCells(state))
+        self.planner.compute_shortest_path(self.gameStats)
+
+        step = self.planner.next_step()
+        if step is None:
+            # Every food is cut off by a ghost: step out of danger if possible, otherwise wait
+            safe = [cell for cell in self.neighbours[position] if cell not in self.planner.blocked]
+            if not safe:
+                return Directions.STOP
+            step = random.choice(safe)
+        nextAction = Actions.vectorToDirection((step[0] - position[0], step[1] - position[1]))
+        self.performedActions.append(str(nextAction))
+        return nextAction
@@ -0,0 +1,145 @@
+'''
+Admissible heuristics for PacmanProblem based on true maze distances
+'''
+# Every heuristic is called as heuristic(state, problem), like the ones in SearchStrategies, with the state
+# starting with (cell index, food bitmask); the states of a JumpPointProblem also carry a direction. Maze distances
+# come from the layout-level oracle of mazeDistances.py, and the per-bitmask values are computed the first time a
+# problem is seen and reused for every call on it. Distances are symmetric, so only the rows of the food cells are
+# ever needed.
+from mazeDistances import UNREACHABLE as ORACLE_UNREACHABLE
+from mazeDistances import getDistanceOracle
+
+UNREACHABLE = float('inf')
+
+
+class MazeDistances:
+    # True maze distances between the cells of a problem, read from the layout-level distance oracle (see
+    # mazeDistances.py) and indexed by problem cell index. Rows are converted on first use. A problem built from a
+    # game state brings its layout's oracle, which is saved next to the .lay file
+    def __init__(self, problem):
+        self.oracle = problem.distance_oracle
+        if self.oracle is None:
+            self.oracle = getDistanceOracle([''.join(row) for row in problem.layout])
+        height = len(problem.layout)
+        # Problem cells are (row, col) from the top left, oracle positions (x, y) from the bottom left
+        self.oracle_cells = []
+        for cell in range(len(problem.moves)):
+            row, col = problem.cell_position(cell)
+            self.oracle_cells.append(self.oracle.index.get((col, height - 1 - row), -1))
+        self.rows = LazyRows(self)
+
+    def row(self, cell):
+        oracle_row = self.oracle.getRow(self.oracle.positions[self.oracle_cells[cell]])
+        return [UNREACHABLE if target < 0 or oracle_row[target] == ORACLE_UNREACHABLE else oracle_row[target]
+                for target in self.oracle_cells]
+
+    def distance(self, a, b):
+        return self.rows[a][b]
+
+
+class LazyRows(dict):
+    def __init__(self, distances):
+        dict.__init__(self)
+        self.distances = distances
+
+    def __missing__(self, cell):
+        row = self.distances.row(cell)
+        self[cell] = row
+        return row
+
+
+class FoodHeuristic:
+    def __init__(self):
+        self.problem = None
+
+    def __call__(self, state, problem):
+        if problem is not self.problem:
+            self.prepare(problem)
+        cell, food_mask = state[0], state[1]
+        if food_mask == 0:
+            return 0
+        return self.estimate(cell, food_mask)
+
+    def prepare(self, problem):
+        self.problem = problem
+        self.distances = MazeDistances(problem)
+        self.food_cells = [problem.cell_index(food) for food in problem.food_positions]
+        self.cache = {}
+
+    def remaining_cells(self, food_mask):
+        return [cell for bit, cell in enumerate(self.food_cells) if food_mask >> bit & 1]
+
+    def nearest(self, cell, food_mask):
+        rows = self.distances.rows
+        return min(rows[food][cell] for food in self.remaining_cells(food_mask))
+
+    def estimate(self, cell, food_mask):
+        raise NotImplementedError
+
+
+class NearestFoodHeuristic(FoodHeuristic):
+    # Maze distance to the closest remaining dot
+    def estimate(self, cell, food_mask):
+        return self.nearest(cell, food_mask)
+
+
+class MSTHeuristic(FoodHeuristic):
+    # Maze distance to the closest remaining dot plus the weight of a minimum spanning tree over the remaining
+    # dots: any tour eating them all has to reach one of them and then connect them all. The tree weight only
+    # depends on the food left, so it is memoized by bitmask
+    def estimate(self, cell, food_mask):
+        weight = self.cache.get(food_mask)
+        if weight is None:
+            weight = self.spanning_tree_weight(self.remaining_cells(food_mask))
+            self.cache[food_mask] = weight
+        return self.nearest(cell, food_mask) + weight
+
+    def spanning_tree_weight(self, foods):
+        # Prim's algorithm on the complete graph of maze distances
+        rows = self.distances.rows
+        best = {food: rows[foods[0]][food] for food in foods[1:]}
+        weight = 0
+        while best:
+            food = min(best, key=best.get)
+            weight += best.pop(food)
+            row = rows[food]
+            for other in best:
+                if row[other] < best[other]:
+                    best[other] = row[other]
+        return weight
+
+
+class FarthestPairHeuristic(FoodHeuristic):
+    # For the two remaining dots a, b that are farthest apart, both have to be eaten: going to the nearer one
+    # first and then to the other costs at least min(d(p, a), d(p, b)) + d(a, b). The pair is memoized by bitmask
+    def estimate(self, cell, food_mask):
+        pair = self.cache.get(food_mask)
+        if pair is None:
+            pair = self.farthest_pair(self.remaining_cells(food_mask))
+            self.cache[food_mask] = pair
+        a, b, between = pair
+        rows = self.distances.rows
+        return min(rows[a][cell], rows[b][cell]) + between
+
+    def farthest_pair(self, foods):
+        rows = self.distances.rows
+        pair = (foods[0], foods[0], 0)
+        for i, a in enumerate(foods):
+            for b in foods[i + 1:]:
+                if rows[a][b] > pair[2]:
+                    pair = (a, b, rows[a][b])
+        return pair
+
+
+# Heuristic names accepted by AStarAgent(heuristic=...)
+HEURISTICS = {
+    'MazeDistance': NearestFoodHeuristic,
+    'MST': MSTHeuristic,
+    'FarthestPair': FarthestPairHeuristic,
+}
+
+
+def get_heuristic(name):
+    if name not in HEURISTICS:
+        raise ValueError("Unknown heuristic: " + str(name))
+    return HEURISTICS[name]()
@@ -0,0 +1,16 @@
+# searchStats.py
+# --------------
+# The search statistics of search_stats.py, in the repository root, which
+# the Pacman scripts share with the sliding puzzle solvers. The Pacman
+# scripts are run from this directory, so the root is added to the module
+# path here and search.py, searchAgents.py and pacman.py import from this
+# module.
+
+import os
+import sys
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPOSITORY_ROOT not in sys.path:
+    sys.path.append(REPOSITORY_ROOT)
+
+from search_stats import COUNTERS, SearchStats, export, write_csv, write_json
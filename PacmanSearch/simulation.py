@@ -0,0 +1,311 @@
+# simulation.py
+# -------------
+# Fast forward simulation of classic Pacman for lookahead and rollouts.
+#
+# GameState.generateSuccessor copies every AgentState and Configuration of
+# the state for each ply. A SimState holds the same game as a handful of
+# flat values (agent positions, directions and scared timers, the food as a
+# bitmask, the capsules and the score) and plays moves in place:
+#
+#     sim = SimState.fromGameState(state)
+#     for action in sim.getLegalActions(0):
+#         sim.apply(0, action)
+#         ...                 # look further ahead, read sim.score, ...
+#         sim.undo()
+#
+# apply() follows the rules of pacman.py (moves, eating, scared ghosts,
+# collisions, time penalty, win and loss) and expects legal actions. Run
+#
+#     python simulation.py [layout] [games]
+#
+# to check it ply by ply against generateSuccessor on random games and to
+# time random rollouts with both.
+
+import random
+import sys
+import time
+
+from game import Actions, BitGrid, Directions
+from pacman import COLLISION_TOLERANCE, SCARED_TIME, TIME_PENALTY, GhostRules, PacmanRules
+
+VECTORS = dict(Actions._directions)
+
+MOVE_TABLES = {}
+
+class MoveTables:
+    """
+    The legal actions of every cell of a wall layout, in the order of
+    Actions.getPossibleActions: for Pacman (Stop included), and for a ghost
+    by the direction it is heading (no Stop, no reversing unless there is
+    no other way). Cells are indexed x * height + y, like BitGrid bits.
+    """
+    def __init__(self, walls):
+        self.height = walls.height
+        self.pacman = {}
+        self.ghost = {}
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if walls[x][y]: continue
+                possible = [direction for direction, (dx, dy) in Actions._directionsAsList
+                            if not walls[x + dx][y + dy]]
+                cell = x * walls.height + y
+                self.pacman[cell] = possible
+                self.ghost[cell] = {}
+                for heading in VECTORS:
+                    legal = [direction for direction in possible if direction != Directions.STOP]
+                    reverse = Actions.reverseDirection(heading)
+                    if reverse in legal and len(legal) > 1:
+                        legal.remove(reverse)
+                    self.ghost[cell][heading] = legal
+
+def moveTables(layout):
+    key = tuple(layout.layoutText)
+    if key not in MOVE_TABLES:
+        MOVE_TABLES[key] = MoveTables(layout.walls)
+    return MOVE_TABLES[key]
+
+def foodBits(food):
+    if isinstance(food, BitGrid):
+        return food.bits
+    bits = 0
+    for x, y in food.asList():
+        bits |= 1 << (x * food.height + y)
+    return bits
+
+class SimState:
+    """
+    A mutable classic Pacman state with apply/undo. Agent 0 is Pacman.
+    """
+    def __init__(self, tables, positions, directions, timers, starts, food, numFood, capsules, score,
+                 win=False, lose=False):
+        self.tables = tables
+        self.height = tables.height
+        self.positions = list(positions)
+        self.directions = list(directions)
+        self.timers = list(timers)
+        self.starts = list(starts)
+        self.food = food
+        self.numFood = numFood
+        self.capsules = tuple(capsules)
+        self.score = score
+        self.win = win
+        self.lose = lose
+        self.history = []
+
+    def fromGameState(state):
+        data = state.data
+        agents = data.agentStates
+        return SimState(moveTables(data.layout),
+                        [agent.configuration.pos for agent in agents],
+                        [agent.configuration.direction for agent in agents],
+                        [agent.scaredTimer for agent in agents],
+                        [(agent.start.pos, agent.start.direction) for agent in agents],
+                        foodBits(data.food), data.numFood, data.capsules, data.score, data._win, data._lose)
+    fromGameState = staticmethod(fromGameState)
+
+    def copy(self):
+        """
+        An independent copy with an empty undo history.
+        """
+        return SimState(self.tables, self.positions, self.directions, self.timers, self.starts, self.food,
+                        self.numFood, self.capsules, self.score, self.win, self.lose)
+
+    def snapshot(self):
+        """
+        Everything that two states must agree on to be the same game.
+        """
+        return (tuple(self.positions), tuple(self.directions), tuple(self.timers), self.food, self.capsules,
+                self.score, self.win, self.lose)
+
+    def __eq__(self, other):
+        return isinstance(other, SimState) and self.snapshot() == other.snapshot()
+
+    def getNumAgents(self):
+        return len(self.positions)
+
+    def getPacmanPosition(self):
+        return self.positions[0]
+
+    def getScore(self):
+        return self.score
+
+    def getNumFood(self):
+        return self.numFood
+
+    def hasFood(self, x, y):
+        return self.food >> (x * self.height + y) & 1 == 1
+
+    def isWin(self):
+        return self.win
+
+    def isLose(self):
+        return self.lose
+
+    def getLegalActions(self, agentIndex=0):
+        """
+        The legal actions of an agent, as generateSuccessor allows them. The
+        list is shared with the move tables and must not be modified.
+        """
+        if self.win or self.lose: return []
+        x, y = self.positions[agentIndex]
+        x_int, y_int = int(x + 0.5), int(y + 0.5)
+        # In between grid points, all agents must continue straight
+        if abs(x - x_int) + abs(y - y_int) > Actions.TOLERANCE:
+            return [self.directions[agentIndex]]
+        cell = x_int * self.height + y_int
+        if agentIndex == 0:
+            return self.tables.pacman[cell]
+        return self.tables.ghost[cell][self.directions[agentIndex]]
+
+    def apply(self, agentIndex, action):
+        """
+        Plays a legal action of agent agentIndex, like generateSuccessor but
+        in place. undo() takes it back.
+        """
+        positions, directions, timers = self.positions, self.directions, self.timers
+        self.history.append((tuple(positions), tuple(directions), tuple(timers), self.food, self.numFood,
+                             self.capsules, self.score, self.win, self.lose))
+        self.win = self.lose = False
+        dx, dy = VECTORS[action]
+        x, y = positions[agentIndex]
+        if action != Directions.STOP:
+            directions[agentIndex] = action
+
+        if agentIndex == 0:
+            x, y = x + dx * PacmanRules.PACMAN_SPEED, y + dy * PacmanRules.PACMAN_SPEED
+            positions[0] = (x, y)
+            # Pacman always ends on a grid point, so it eats there
+            position = (int(x + 0.5), int(y + 0.5))
+            bit = 1 << (position[0] * self.height + position[1])
+            if self.food & bit:
+                self.food ^= bit
+                self.numFood -= 1
+                self.score += 10
+                if self.numFood == 0:
+                    self.score += 500
+                    self.win = True
+            if position in self.capsules:
+                self.capsules = tuple(capsule for capsule in self.capsules if capsule != position)
+                for index in range(1, len(timers)):
+                    timers[index] = SCARED_TIME
+            self.score -= TIME_PENALTY
+            for index in range(1, len(positions)):
+                self._checkCollision(index)
+        else:
+            speed = GhostRules.GHOST_SPEED
+            if timers[agentIndex] > 0: speed /= 2.0
+            x, y = x + dx * speed, y + dy * speed
+            timer = timers[agentIndex]
+            if timer == 1:
+                x, y = int(x + 0.5), int(y + 0.5)
+            positions[agentIndex] = (x, y)
+            timers[agentIndex] = max(0, timer - 1)
+            self._checkCollision(agentIndex)
+
+    def _checkCollision(self, ghostIndex):
+        pacmanX, pacmanY = self.positions[0]
+        ghostX, ghostY = self.positions[ghostIndex]
+        if abs(ghostX - pacmanX) + abs(ghostY - pacmanY) <= COLLISION_TOLERANCE:
+            if self.timers[ghostIndex] > 0:
+                self.score += 200
+                self.positions[ghostIndex], self.directions[ghostIndex] = self.starts[ghostIndex]
+                self.timers[ghostIndex] = 0
+            elif not self.win:
+                self.score -= 500
+                self.lose = True
+
+    def undo(self):
+        """
+        Takes back the last apply().
+        """
+        (positions, directions, timers, self.food, self.numFood, self.capsules, self.score, self.win,
+         self.lose) = self.history.pop()
+        self.positions = list(positions)
+        self.directions = list(directions)
+        self.timers = list(timers)
+
+def checkParity(layout, games=20, plies=400, seed=0):
+    """
+    Plays random games with generateSuccessor and a SimState side by side
+    and checks after every ply that they hold the same game and offer the
+    same actions; then undoes every ply back to the start.
+    Returns the number of plies checked.
+    """
+    import pacman
+    rng = random.Random(seed)
+    checked = 0
+    for _ in range(games):
+        state = pacman.GameState()
+        state.initialize(layout, len(layout.agentPositions))
+        sim = SimState.fromGameState(state)
+        start = sim.copy()
+        for ply in range(plies):
+            agentIndex = ply % state.getNumAgents()
+            legal = state.getLegalActions(agentIndex)
+            if list(sim.getLegalActions(agentIndex)) != legal:
+                raise AssertionError('Legal actions differ at ply %d: %s, %s' %
+                                     (ply, sim.getLegalActions(agentIndex), legal))
+            if not legal: break
+            action = rng.choice(legal)
+            state = state.generateSuccessor(agentIndex, action)
+            sim.apply(agentIndex, action)
+            if sim != SimState.fromGameState(state):
+                raise AssertionError('States differ after ply %d (%s by agent %d):\n%s\n%s' %
+                                     (ply, action, agentIndex, sim.snapshot(),
+                                      SimState.fromGameState(state).snapshot()))
+            checked += 1
+        while sim.history:
+            sim.undo()
+        if sim != start:
+            raise AssertionError('Undo did not restore the start state')
+    return checked
+
+def benchmarkRollouts(layout, rollouts=200, depth=100, seed=0):
+    """
+    Random rollouts of depth plies from the start of a game, with
+    generateSuccessor and with SimState apply/undo. Prints plies per ms.
+    """
+    import pacman
+    state = pacman.GameState()
+    state.initialize(layout, len(layout.agentPositions))
+
+    rng = random.Random(seed)
+    plies = 0
+    startTime = time.perf_counter()
+    for _ in range(rollouts):
+        current = state
+        for ply in range(depth):
+            agentIndex = ply % current.getNumAgents()
+            legal = current.getLegalActions(agentIndex)
+            if not legal: break
+            current = current.generateSuccessor(agentIndex, rng.choice(legal))
+            plies += 1
+    successorRate = plies / ((time.perf_counter() - startTime) * 1000)
+
+    rng = random.Random(seed)
+    sim = SimState.fromGameState(state)
+    plies = 0
+    startTime = time.perf_counter()
+    for _ in range(rollouts):
+        for ply in range(depth):
+            agentIndex = ply % len(sim.positions)
+            legal = sim.getLegalActions(agentIndex)
+            if not legal: break
+            sim.apply(agentIndex, rng.choice(legal))
+            plies += 1
+        while sim.history:
+            sim.undo()
+    simRate = plies / ((time.perf_counter() - startTime) * 1000)
+
+    print('%d random rollouts of %d plies' % (rollouts, depth))
+    print('%-20s %12s' % ('', 'Plies per ms'))
+    print('%-20s %12.1f' % ('generateSuccessor', successorRate))
+    print('%-20s %12.1f' % ('SimState', simRate))
+
+if __name__ == '__main__':
+    import layout
+    layoutName = sys.argv[1] if len(sys.argv) > 1 else 'mediumClassic'
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    board = layout.getLayout(layoutName)
+    print('Parity with generateSuccessor: %d plies checked' % checkParity(board, games))
+    benchmarkRollouts(board)
@@ -205,6 +205,153 @@ class PriorityQueue:
         else:
             self.push(item, priority)
 
+class IndexedPriorityQueue:
+    """
+      A priority queue holding at most one entry per key, where the key of
+      an item is given by keyFunction (the item itself by default).
+
+      In the default mode the queue is a binary heap together with a map
+      from each key to its position in the heap, so update (decrease-key)
+      finds the entry in O(1) and moves it in O(log n), instead of scanning
+      the heap like PriorityQueue.update.
+
+      With lazy=True, update pushes a new entry instead of moving the old
+      one, and entries that have been superseded are skipped when popped.
+      That trades some memory for simpler, usually faster, operations.
+
+      Among items of equal priority, the one pushed or lowered first is
+      popped first, as with PriorityQueue.
+    """
+    def __init__(self, keyFunction=None, lazy=False):
+        self.keyFunction = keyFunction
+        self.lazy = lazy
+        # Entries are ((priority, count), key, item); the counts are unique,
+        # so entries never compare keys or items
+        self.heap = []
+        self.count = 0
+        # key -> heap index (eager mode) or live (priority, count) (lazy mode)
+        self.index = {}
+
+    def key(self, item):
+        return item if self.keyFunction is None else self.keyFunction(item)
+
+    def push(self, item, priority):
+        "Adds an item, replacing any entry with the same key"
+        key = self.key(item)
+        rank = (priority, self.count)
+        self.count += 1
+        if self.lazy:
+            self.index[key] = rank
+            heapq.heappush(self.heap, (rank, key, item))
+        elif key in self.index:
+            position = self.index[key]
+            lower = rank < self.heap[position][0]
+            self.heap[position] = (rank, key, item)
+            if lower:
+                self._siftUp(position)
+            else:
+                self._siftDown(position)
+        else:
+            self.heap.append((rank, key, item))
+            self._siftUp(len(self.heap) - 1)
+
+    def pop(self):
+        if self.lazy:
+            while True:
+                (rank, key, item) = heapq.heappop(self.heap)
+                if self.index.get(key) == rank:
+                    del self.index[key]
+                    return item
+        last = self.heap.pop()
+        if not self.heap:
+            del self.index[last[1]]
+            return last[2]
+        (_, key, item) = self.heap[0]
+        del self.index[key]
+        self.heap[0] = last
+        self._siftDown(0)
+        return item
+
+    def isEmpty(self):
+        return len(self.index) == 0
+
+    def __len__(self):
+        "Number of live entries (stale lazy entries are not counted)"
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def priority(self, key):
+        "Current priority of the entry with this key"
+        if self.lazy:
+            return self.index[key][0]
+        return self.heap[self.index[key]][0][0]
+
+    def peekPriority(self):
+        "Priority of the item pop would return next"
+        if self.lazy:
+            while self.index.get(self.heap[0][1]) != self.heap[0][0]:
+                heapq.heappop(self.heap)
+        return self.heap[0][0][0]
+
+    def remove(self, key):
+        "Drops the entry with this key, if there is one"
+        if key not in self.index:
+            return
+        if self.lazy:
+            del self.index[key]
+            return
+        position = self.index.pop(key)
+        last = self.heap.pop()
+        if position < len(self.heap):
+            lower = last[0] < self.heap[position][0]
+            self.heap[position] = last
+            if lower:
+                self._siftUp(position)
+            else:
+                self._siftDown(position)
+
+    def update(self, item, priority):
+        # Same contract as PriorityQueue.update: if an entry with the same key
+        # has a higher priority, lower it to this item and priority; if it has
+        # an equal or lower priority, do nothing; otherwise push the item.
+        key = self.key(item)
+        if key in self.index and self.priority(key) <= priority:
+            return
+        self.push(item, priority)
+
+    def _siftUp(self, position):
+        heap, index = self.heap, self.index
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if heap[parent][0] < entry[0]:
+                break
+            heap[position] = heap[parent]
+            index[heap[position][1]] = position
+            position = parent
+        heap[position] = entry
+        index[entry[1]] = position
+
+    def _siftDown(self, position):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if entry[0] < heap[child][0]:
+                break
+            heap[position] = heap[child]
+            index[heap[position][1]] = position
+            position = child
+        heap[position] = entry
+        index[entry[1]] = position
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -3,6 +3,21 @@ import numpy as np
 import random
 from collections import deque
 import heapq
+import os
+import sys
+import time
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from puzzle_state import REVERSE_MOVE, board_for_size, board_for_width, pack, slide, slide_packed, to_tiles
+from puzzle_heuristics import register_goals
+from puzzle_pdb import PatternDatabase
+from puzzle_oracle import SolutionOracle
+from puzzle_solvability import count_inversions as fast_count_inversions
+from puzzle_solvability import parity_class as solvability_class
+from puzzle_solvability import random_solvable_state, random_solvable_states
+from search_stats import SearchStats, export as export_stats
 
 
 # The goal state configuration
@@ -18,105 +33,498 @@ goal_state_2 = np.array([
     [6, 7, 8]
 ])
 
+goal_tiles_1 = to_tiles(goal_state_1)
+goal_tiles_2 = to_tiles(goal_state_2)
+
+# Goal boards by number of tiles. Other widths follow the same two
+# conventions: blank last, or blank first
+GOALS = {9: (goal_tiles_1, goal_tiles_2)}
+
+def goals_for(width):
+    size = width * width
+    if size not in GOALS:
+        GOALS[size] = (tuple(range(1, size)) + (0,), tuple(range(size)))
+    return GOALS[size]
+
+# Manhattan distance table for both goals, built once at import
+MANHATTAN = register_goals('default', (goal_tiles_1, goal_tiles_2))
+
+# Heuristics by (name, width); pattern databases and tables for other widths
+# are only built (or loaded from disk) on first use
+HEURISTICS = {('manhattan', 3): MANHATTAN}
+
+# Heuristics a_star can be asked for by name
+def get_heuristic(name, width=3):
+    key = (name, width)
+    if key not in HEURISTICS:
+        if name == 'manhattan':
+            HEURISTICS[key] = register_goals('manhattan-%d' % width, goals_for(width), width)
+        elif name == 'pdb':
+            HEURISTICS[key] = PatternDatabase(goals_for(width), width=width)
+        else:
+            raise ValueError("Unknown heuristic: " + str(name))
+    return HEURISTICS[key]
+
+# Full distance/best-move table, built once and then mmapped from disk
+# (3x3 only: larger boards have far too many states)
+ORACLE = None
+
+def get_oracle():
+    global ORACLE
+    if ORACLE is None:
+        ORACLE = SolutionOracle((goal_tiles_1, goal_tiles_2))
+    return ORACLE
+
 # Define the state class
+# The board is kept as a flat tuple with the blank index cached next to it
+# (see puzzle_state.py), so expanding a node is a table lookup plus a tuple
+# copy instead of numpy searches and array copies. `key` is the bit-packed
+# board (64 bits for 4x4), updated in O(1) per move and used for hashing
+# and equality. Any square board size works.
 class State:
+    __slots__ = ('state', 'blank', 'key', 'parent', 'move', 'depth', 'seq', 'h')
     _seq = 0
-    
-    def __init__(self, state, parent=None, move=None, depth=0):
-        self.state = np.array(state)
+
+    def __init__(self, state, parent=None, move=None, depth=0, blank=None, key=None):
+        self.state = state if type(state) is tuple else to_tiles(state)
+        self.blank = self.state.index(0) if blank is None else blank
+        self.key = pack(self.state) if key is None else key
         self.parent = parent
         self.move = move
         self.depth = depth
+        self.h = None
         self.seq = State._seq
         State._seq += 1
 
+    def width(self):
+        return board_for_size(len(self.state)).width
+
     def get_possible_moves(self):
+        tiles, blank, key, depth = self.state, self.blank, self.key, self.depth + 1
+        board = board_for_size(len(tiles))
+        shift = board.shifts
         moves = []
-        zero_pos = tuple(zip(*np.where(self.state == 0)))[0]
-        if zero_pos[0] > 0:  # Up
-            new_state = np.copy(self.state)
-            new_state[zero_pos], new_state[zero_pos[0]-1, zero_pos[1]] = new_state[zero_pos[0]-1, zero_pos[1]], new_state[zero_pos]
-            moves.append(State(new_state, self, 'Up', self.depth + 1))
-        if zero_pos[0] < 2:  # Down
-            new_state = np.copy(self.state)
-            new_state[zero_pos], new_state[zero_pos[0]+1, zero_pos[1]] = new_state[zero_pos[0]+1, zero_pos[1]], new_state[zero_pos]
-            moves.append(State(new_state, self, 'Down', self.depth + 1))
-        if zero_pos[1] > 0:  # Left
-            new_state = np.copy(self.state)
-            new_state[zero_pos], new_state[zero_pos[0], zero_pos[1]-1] = new_state[zero_pos[0], zero_pos[1]-1], new_state[zero_pos]
-            moves.append(State(new_state, self, 'Left', self.depth + 1))
-        if zero_pos[1] < 2:  # Right
-            new_state = np.copy(self.state)
-            new_state[zero_pos], new_state[zero_pos[0], zero_pos[1]+1] = new_state[zero_pos[0], zero_pos[1]+1], new_state[zero_pos]
-            moves.append(State(new_state, self, 'Right', self.depth + 1))
+        for name, target in board.move_table[blank]:
+            child_key = slide_packed(key, tiles[target], blank, target, shift)
+            moves.append(State(slide(tiles, blank, target), self, name, depth, target, child_key))
         return moves
 
     def is_goal(self):
-        return np.array_equal(self.state, goal_state_1) or np.array_equal(self.state, goal_state_2)
+        goals = GOALS.get(len(self.state)) or goals_for(self.width())
+        return self.state in goals
 
     def __eq__(self, other):
-        return np.array_equal(self.state, other.state)
+        return self.key == other.key
 
     def __hash__(self):
-        return hash(str(self.state))
-    
+        return hash(self.key)
+
+    # Heuristic value, filled in incrementally by a_star or computed on demand
+    def heuristic(self):
+        if self.h is None:
+            self.h = get_heuristic('manhattan', self.width()).distance(self.state)
+        return self.h
+
     def total_cost(self):
-        return self.depth + manhattan_distance(self.state)
+        return self.depth + self.heuristic()
+
 
 
+# Search statistics: `stats` is a SearchStats or a dict (see search_stats)
+# and receives the counters and phase times once the search is over. The
+# solvers only keep local counters, so stats=None costs next to nothing
+def record_stats(stats, expanded, peak_nodes, **counts):
+    if stats is not None:
+        stats.update(expanded=expanded, peak_nodes=peak_nodes, **counts)
 
 # BFS algorithm to find the solution
-def bfs(initial_state):
+def bfs(initial_state, stats=None):
+    start_time = time.perf_counter()
     visited = set()
     queue = deque([State(initial_state)])
+    expanded = generated = duplicates = 0
+    peak_nodes = max_frontier = 1
+    solution = None
 
     while queue:
+        peak_nodes = max(peak_nodes, len(queue) + len(visited))
+        max_frontier = max(max_frontier, len(queue))
         current_state = queue.popleft()
         if current_state.is_goal():
-            return current_state
+            solution = current_state
+            break
         visited.add(current_state)
+        expanded += 1
         for move in current_state.get_possible_moves():
+            generated += 1
             if move not in visited:
                 queue.append(move)
-    return None
+            else:
+                duplicates += 1
+    record_stats(stats, expanded, peak_nodes, generated=generated, duplicates=duplicates,
+                 max_frontier=max_frontier, phases={'search': time.perf_counter() - start_time})
+    return solution
+
+# Bidirectional BFS: one frontier grows from the start and one from both
+# goals, a whole layer at a time (the smaller frontier first), until they meet.
+# Nodes are marked when generated, so nothing is queued twice. The forward
+# side keeps States; the backward side maps each board to the move towards
+# the goal, the next board and its distance, which is used to stitch the
+# second half of the path onto the forward States for reconstruct_path.
+def bidirectional_bfs(initial_state, stats=None):
+    start_time = time.perf_counter()
+    start_state = State(initial_state)
+    expanded = generated = duplicates = 0
+    max_frontier = 1
+    meet = None
+
+    if start_state.is_goal():
+        meet = start_state.state
+    forward = {start_state.state: start_state}
+    forward_frontier = [start_state]
+    backward = {}
+    backward_frontier = []
+    move_table = board_for_size(len(start_state.state)).move_table
+    for goal in goals_for(start_state.width()):
+        if goal not in backward:
+            backward[goal] = (None, None, 0)
+            backward_frontier.append(goal)
+
+    while meet is None and forward_frontier and backward_frontier:
+        max_frontier = max(max_frontier, len(forward_frontier) + len(backward_frontier))
+        best_cost = None
+        next_frontier = []
+        if len(forward_frontier) <= len(backward_frontier):
+            for current_state in forward_frontier:
+                expanded += 1
+                for move in current_state.get_possible_moves():
+                    generated += 1
+                    if move.state in forward:
+                        duplicates += 1
+                        continue
+                    forward[move.state] = move
+                    next_frontier.append(move)
+                    if move.state in backward:
+                        cost = move.depth + backward[move.state][2]
+                        if best_cost is None or cost < best_cost:
+                            best_cost, meet = cost, move.state
+            forward_frontier = next_frontier
+        else:
+            for tiles in backward_frontier:
+                expanded += 1
+                blank = tiles.index(0)
+                depth = backward[tiles][2] + 1
+                for name, target in move_table[blank]:
+                    child = slide(tiles, blank, target)
+                    generated += 1
+                    if child in backward:
+                        duplicates += 1
+                        continue
+                    # From the child, the opposite slide leads back to `tiles`
+                    backward[child] = (REVERSE_MOVE[name], tiles, depth)
+                    next_frontier.append(child)
+                    if child in forward:
+                        cost = forward[child].depth + depth
+                        if best_cost is None or cost < best_cost:
+                            best_cost, meet = cost, child
+            backward_frontier = next_frontier
+
+    search_end = time.perf_counter()
+    phases = {'search': search_end - start_time}
+    counts = dict(generated=generated, duplicates=duplicates, max_frontier=max_frontier, phases=phases)
+    if meet is None:
+        record_stats(stats, expanded, len(forward) + len(backward), **counts)
+        return None
+
+    current_state = forward[meet]
+    move, next_tiles, _ = backward[meet]
+    while move is not None:
+        current_state = State(next_tiles, current_state, move, current_state.depth + 1)
+        move, next_tiles, _ = backward[next_tiles]
+    phases['stitch'] = time.perf_counter() - search_end
+    record_stats(stats, expanded, len(forward) + len(backward), **counts)
+    return current_state
 
 # Calculate Manhattan distance
 def manhattan_distance(state):
-    distance = 0
-    for value in range(1, 9):  # 1 to 8 tiles
-        current_position = np.where(state == value)
-        
-        if current_position[0].size == 0:
-            continue
-        
-        goal_position_1 = np.where(goal_state_1 == value)
-        goal_position_2 = np.where(goal_state_2 == value)
-        
-        # Compute distance to both goal state and take minimum
-        distance_1 = abs(current_position[0][0] - goal_position_1[0][0]) + abs(current_position[1][0] - goal_position_1[1][0])
-        distance_2 = abs(current_position[0][0] - goal_position_2[0][0]) + abs(current_position[1][0] - goal_position_2[1][0])
-        
-        # Update minimum
-        distance += min(distance_1, distance_2)
-    return distance
+    tiles = to_tiles(state)
+    return get_heuristic('manhattan', board_for_size(len(tiles)).width).distance(tiles)
 
 # A* algorithm to find the solution
-def a_star(initial_state):
+# `heuristic` is a name accepted by get_heuristic
+def a_star(initial_state, heuristic='manhattan', stats=None):
+    start_time = time.perf_counter()
     visited = set()
     start_state = State(initial_state)
-    frontier = [(start_state.depth + manhattan_distance(initial_state), start_state.depth, start_state.seq, start_state)]
+    estimator = get_heuristic(heuristic, start_state.width())
+    start_state.h = estimator.distance(start_state.state)
+    frontier = [(start_state.total_cost(), start_state.depth, start_state.seq, start_state)]
+    expanded = generated = duplicates = 0
+    peak_nodes = max_frontier = 1
+    solution = None
+    search_start = time.perf_counter()
 
     while frontier:
+        peak_nodes = max(peak_nodes, len(frontier) + len(visited))
+        max_frontier = max(max_frontier, len(frontier))
         _, _, _, current_state = heapq.heappop(frontier)
         if current_state.is_goal():
-            return current_state
+            solution = current_state
+            break
         visited.add(current_state)
-        
+        expanded += 1
+
+        tiles, blank, h = current_state.state, current_state.blank, current_state.h
         for move in current_state.get_possible_moves():
+            generated += 1
             if move not in visited:
-                new_cost = move.depth + manhattan_distance(move.state)
+                # Only the tile that slid into the old blank changes its distance
+                move.h = estimator.update(h, tiles, blank, move.blank)
+                new_cost = move.depth + move.h
                 heapq.heappush(frontier, (new_cost, move.depth, move.seq, move))
-    return None
+            else:
+                duplicates += 1
+    record_stats(stats, expanded, peak_nodes, generated=generated, duplicates=duplicates,
+                 max_frontier=max_frontier, phases={'setup': search_start - start_time,
+                                                    'search': time.perf_counter() - search_start})
+    return solution
+
+# IDA*: depth-first searches bounded by f = g + h, raising the bound to the
+# smallest f that exceeded it. Only the current path and the siblings along
+# it are kept, so memory is linear in the solution depth. Returns None if
+# `max_expansions` is reached before a solution is found.
+def ida_star(initial_state, heuristic='manhattan', max_expansions=None, stats=None):
+    start_time = time.perf_counter()
+    start_state = State(initial_state)
+    estimator = get_heuristic(heuristic, start_state.width())
+    start_state.h = estimator.distance(start_state.state)
+    counters = {'expanded': 0, 'generated': 0, 'duplicates': 0, 'stored': 1, 'peak': 1}
+    search_start = time.perf_counter()
+    if not is_solvable(start_state.state):
+        record_stats(stats, 0, 1, phases={'setup': search_start - start_time})
+        return None
+
+    # Returns the goal State, or the smallest f above the bound (None once
+    # the expansion budget is spent)
+    def search(current_state, bound, on_path):
+        f = current_state.depth + current_state.h
+        if f > bound:
+            return f
+        if current_state.is_goal():
+            return current_state
+        if max_expansions is not None and counters['expanded'] >= max_expansions:
+            return None
+        counters['expanded'] += 1
+
+        tiles, blank, h = current_state.state, current_state.blank, current_state.h
+        children = current_state.get_possible_moves()
+        moves = [move for move in children if move.state not in on_path]
+        counters['generated'] += len(children)
+        counters['duplicates'] += len(children) - len(moves)
+        counters['stored'] += len(moves)
+        counters['peak'] = max(counters['peak'], counters['stored'])
+        next_bound = float('inf')
+        for move in moves:
+            move.h = estimator.update(h, tiles, blank, move.blank)
+            on_path.add(move.state)
+            result = search(move, bound, on_path)
+            on_path.discard(move.state)
+            if result is None or isinstance(result, State):
+                counters['stored'] -= len(moves)
+                return result
+            next_bound = min(next_bound, result)
+        counters['stored'] -= len(moves)
+        return next_bound
+
+    bound = start_state.h
+    solution = None
+    while True:
+        result = search(start_state, bound, {start_state.state})
+        if result is None or isinstance(result, State):
+            solution = result
+            break
+        if result == float('inf'):
+            break
+        bound = result
+    # The siblings along the current path are IDA*'s whole frontier
+    record_stats(stats, counters['expanded'], counters['peak'], generated=counters['generated'],
+                 duplicates=counters['duplicates'], max_frontier=counters['peak'],
+                 phases={'setup': search_start - start_time, 'search': time.perf_counter() - search_start})
+    return solution
+
+# Node of the memory-bounded search: wraps a State with its f value, the
+# children currently in memory and the best f among forgotten children
+class MemoryNode:
+    __slots__ = ('state', 'parent', 'f', 'children', 'forgotten', 'in_open', 'version')
+
+    def __init__(self, state, parent, f):
+        self.state = state
+        self.parent = parent
+        self.f = f
+        self.children = {}
+        self.forgotten = float('inf')
+        self.in_open = False
+        self.version = 0
+
+# SMA*-style memory-bounded A*: a tree search holding at most `max_nodes`
+# nodes (plus the children of the node just expanded, until the excess is
+# forgotten). When memory is full the leaf with the highest f (shallowest on ties)
+# is forgotten and its f is backed up into its parent, which goes back on the
+# open list with that f so the forgotten child is regenerated when it becomes
+# the best choice again. A goal needing more than max_nodes - 1 moves cannot
+# be represented and is reported as not found, as is hitting `max_expansions`.
+def sma_star(initial_state, heuristic='manhattan', max_nodes=10000, max_expansions=None, stats=None):
+    start_time = time.perf_counter()
+    infinity = float('inf')
+    start_state = State(initial_state)
+    estimator = get_heuristic(heuristic, start_state.width())
+    start_state.h = estimator.distance(start_state.state)
+    best_heap, worst_heap = [], []
+    open_count = 0
+    stored = 1
+    peak_nodes = max_frontier = 1
+    expanded = generated = duplicates = 0
+    solution = None
+
+    def push(node):
+        node.in_open = True
+        node.version += 1
+        heapq.heappush(best_heap, (node.f, -node.state.depth, node.state.seq, node.version, node))
+        heapq.heappush(worst_heap, (-node.f, node.state.depth, node.state.seq, node.version, node))
+
+    def pop_best():
+        while best_heap:
+            _, _, _, version, node = heapq.heappop(best_heap)
+            if node.in_open and node.version == version:
+                node.in_open = False
+                return node
+        return None
+
+    # Worst node of the open list that has no children in memory. Entries of
+    # nodes that still have children can be dropped: a node is pushed again
+    # when its last child is forgotten
+    def pop_worst_leaf():
+        while worst_heap:
+            _, _, _, version, node = heapq.heappop(worst_heap)
+            if node.in_open and node.version == version and not node.children and node.parent is not None:
+                node.in_open = False
+                return node
+        return None
+
+    if is_solvable(start_state.state):
+        push(MemoryNode(start_state, None, start_state.depth + start_state.h))
+        open_count = 1
+    search_start = time.perf_counter()
+
+    while open_count:
+        node = pop_best()
+        open_count -= 1
+        if node.f == infinity:
+            break
+        current_state = node.state
+        if current_state.is_goal():
+            solution = current_state
+            break
+        if max_expansions is not None and expanded >= max_expansions:
+            break
+        expanded += 1
+
+        # (Re)generate every child that is not already in memory
+        tiles, blank, h = current_state.state, current_state.blank, current_state.h
+        parent_tiles = node.parent.state.state if node.parent else None
+        node.forgotten = infinity
+        for move in current_state.get_possible_moves():
+            generated += 1
+            if move.state == parent_tiles or move.state in node.children:
+                duplicates += 1
+                continue
+            move.h = estimator.update(h, tiles, blank, move.blank)
+            if move.depth >= max_nodes - 1 and not move.is_goal():
+                f = infinity
+            else:
+                f = max(node.f, move.depth + move.h)
+            child = MemoryNode(move, node, f)
+            node.children[move.state] = child
+            push(child)
+            open_count += 1
+            stored += 1
+        peak_nodes = max(peak_nodes, stored)
+        max_frontier = max(max_frontier, open_count)
+
+        while stored > max_nodes:
+            worst = pop_worst_leaf()
+            if worst is None:
+                break
+            open_count -= 1
+            stored -= 1
+            parent = worst.parent
+            del parent.children[worst.state.state]
+            parent.forgotten = min(parent.forgotten, worst.f)
+            if not parent.in_open:
+                open_count += 1
+            parent.f = parent.forgotten
+            push(parent)
+
+    record_stats(stats, expanded, peak_nodes, generated=generated, duplicates=duplicates,
+                 max_frontier=max_frontier, phases={'setup': search_start - start_time,
+                                                    'search': time.perf_counter() - search_start})
+    return solution
+
+# Solve by walking the precomputed oracle table, no search involved
+# Returns the goal State like bfs and a_star, so reconstruct_path works on it
+def solve_via_oracle(initial_state):
+    current_state = State(initial_state)
+    if len(current_state.state) != 9:
+        raise ValueError("The oracle only covers the 3x3 puzzle")
+    moves = get_oracle().solve(current_state.state)
+    if moves is None:
+        return None
+    for name in moves:
+        target = dict(board_for_size(9).move_table[current_state.blank])[name]
+        current_state = State(slide(current_state.state, current_state.blank, target),
+                              current_state, name, current_state.depth + 1, target)
+    return current_state
+
+# Run a solver by the name used in main()
+def run_algorithm(algorithm, initial_state, stats=None):
+    algorithm = algorithm.lower()
+    if algorithm == 'bfs':
+        return bfs(initial_state, stats)
+    if algorithm == 'bidirectional':
+        return bidirectional_bfs(initial_state, stats)
+    if algorithm == 'a*':
+        return a_star(initial_state, stats=stats)
+    if algorithm == 'a*-pdb':
+        return a_star(initial_state, heuristic='pdb', stats=stats)
+    if algorithm == 'ida*':
+        return ida_star(initial_state, stats=stats)
+    if algorithm == 'sma*':
+        return sma_star(initial_state, stats=stats)
+    if algorithm == 'oracle':
+        start_time = time.perf_counter()
+        solution = solve_via_oracle(initial_state)
+        record_stats(stats, 0, 0, phases={'lookup': time.perf_counter() - start_time})
+        return solution
+    raise ValueError("Unknown algorithm: " + str(algorithm))
+
+# Compare oracle path lengths with a_star on random solvable instances
+def cross_check_oracle(count):
+    mismatches = 0
+    checked = 0
+    while checked < count:
+        initial_state = generate_random_state()
+        oracle_solution = solve_via_oracle(initial_state)
+        if oracle_solution is None:
+            continue
+        a_star_solution = a_star(initial_state)
+        oracle_cost = len(reconstruct_path(oracle_solution))
+        a_star_cost = len(reconstruct_path(a_star_solution)) if a_star_solution else None
+        if oracle_cost != a_star_cost:
+            mismatches += 1
+            print("Mismatch on", to_tiles(initial_state), "oracle:", oracle_cost, "a*:", a_star_cost)
+        checked += 1
+    print("Checked %d instances, %d mismatches" % (count, mismatches))
+    return mismatches == 0
 
 # Reconstruct the path from the goal state to the initial state
 def reconstruct_path(end_state):
@@ -127,53 +535,160 @@ def reconstruct_path(end_state):
     return actions[::-1]
 
 def count_inversions(state):
-    flattened_state = state.flatten()
-    inversions = 0
-    for i in range(len(flattened_state)):
-        for j in range(i + 1, len(flattened_state)):
-            if flattened_state[i] > flattened_state[j] and flattened_state[j] != 0:
-                inversions += 1
-    return inversions
+    return fast_count_inversions(to_tiles(state))
 
 def find_blank_row_from_bottom(state):
     # Find the row of the blank tile (0), counting from the bottom
-    blank_row = np.where(state == 0)[0][0]
-    return len(state) - blank_row
+    tiles = to_tiles(state)
+    width = board_for_size(len(tiles)).width
+    return width - tiles.index(0) // width
 
+# Inversion parity, plus the blank row on even widths (see puzzle_solvability)
+def parity_class(tiles):
+    tiles = to_tiles(tiles)
+    return solvability_class(tiles, board_for_size(len(tiles)).width)
+
+def goal_classes(width):
+    return set(parity_class(goal) for goal in goals_for(width))
+
+# Solvable if the board is in the parity class of one of the goals
 def is_solvable(state):
-    inversions = count_inversions(state)
-    blank_row = find_blank_row_from_bottom(state)
-    if blank_row % 2 == 0:  # Even row (counting from the bottom)
-        return inversions % 2 != 0  # Solvable if odd number of inversions
-    else:  # Odd row
-        return inversions % 2 == 0  # Solvable if even number of inversions
-
-# Example usage in generate_random_state
-def generate_random_state():
-    while True:
-        state = np.arange(9)
-        np.random.shuffle(state)
-        state = state.reshape((3, 3))
-        if is_solvable(state):
-            return state
+    tiles = to_tiles(state)
+    return parity_class(tiles) in goal_classes(board_for_size(len(tiles)).width)
+
+# `rng` may be a numpy RandomState/Generator for reproducible instances.
+# Boards in the wrong parity class are fixed with one tile swap rather than
+# redrawn
+def generate_random_state(rng=None, width=3):
+    if rng is None:
+        rng = np.random
+    return random_solvable_state(rng, width, goal_classes(width))
 
+# Random walk of `moves` slides from the first goal, for instances of a
+# controlled difficulty on boards where uniform random ones are too hard
+def scramble_state(moves, rng=None, width=3):
+    if rng is None:
+        rng = np.random
+    move_table = board_for_width(width).move_table
+    tiles = goals_for(width)[0]
+    blank = tiles.index(0)
+    for _ in range(moves):
+        choices = move_table[blank]
+        _, target = choices[rng.randint(len(choices))]
+        tiles = slide(tiles, blank, target)
+        blank = target
+    return np.array(tiles).reshape((width, width))
+
+# Uniform random boards wider than 3 are far too deep for the benchmark, so
+# their instances default to random walks of this many slides. BFS is only
+# benchmarked on the 8-puzzle: even these walks are too deep for it on 4x4
+LARGE_BOARD_SCRAMBLE = 30
+
+# All instances are drawn in the parent from one seed, so a batch run gives
+# the same instances whatever the number of workers
+def generate_instances(count, seed=None, width=3, scramble=None):
+    rng = np.random.RandomState(seed)
+    if scramble is not None:
+        return [scramble_state(scramble, rng, width) for _ in range(count)]
+    return list(random_solvable_states(count, rng, width, goal_classes(width)))
+
+# Batch solving
+# Each instance yields its path length (None if unsolved), the number of
+# expanded nodes, the peak number of nodes in memory, the wall time spent
+# in the solver and the full SearchStats of the run
+SolveResult = namedtuple('SolveResult', ['length', 'expanded', 'peak_nodes', 'seconds', 'stats'])
+
+def solve_instance(algorithm, initial_state):
+    stats = SearchStats(algorithm)
+    start_time = time.perf_counter()
+    solution_state = run_algorithm(algorithm, initial_state, stats)
+    reconstruct_start = time.perf_counter()
+    length = len(reconstruct_path(solution_state)) if solution_state else None
+    stats.update(solution_length=length, phases={'reconstruct': time.perf_counter() - reconstruct_start})
+    return SolveResult(length, stats.expanded, stats.peak_nodes, reconstruct_start - start_time, stats)
+
+# Solve every start state with `algorithm`, spread over `workers` processes
+# (all cores by default, 1 runs inline). Results keep the input order
+def solve_batch(initial_states, algorithm, workers=None, chunk_size=None):
+    initial_states = [to_tiles(state) for state in initial_states]
+    # Load lookup tables before forking so the workers share them
+    if initial_states and algorithm.lower() == 'a*-pdb':
+        get_heuristic('pdb', board_for_size(len(initial_states[0])).width)
+    elif algorithm.lower() == 'oracle':
+        get_oracle()
+
+    if workers == 1:
+        return [solve_instance(algorithm, state) for state in initial_states]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, len(initial_states) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(solve_instance, algorithm), initial_states, chunksize=chunk_size))
+
+# Expansion rate of the informed searches as the board grows. Instances are
+# random walks of `scramble` moves so every width stays tractable; the rate
+# is total expanded nodes over total solver time
+def benchmark_scaling(widths, count, scramble, seed=None, workers=None):
+    print("%-6s %-8s %12s %10s %14s" % ('Width', 'Search', 'Expanded', 'Seconds', 'Nodes/sec'))
+    for width in widths:
+        instances = generate_instances(count, seed, width, scramble)
+        for algorithm in ('a*', 'ida*'):
+            results = solve_batch(instances, algorithm, workers)
+            expanded = sum(result.expanded for result in results)
+            seconds = sum(result.seconds for result in results)
+            print("%-6s %-8s %12d %10.2f %14.0f" % ('%dx%d' % (width, width), algorithm, expanded, seconds,
+                                                   expanded / seconds if seconds else 0))
 
 # The main function where you type the input to get the output
 def main():
+    parser = argparse.ArgumentParser(description='Sliding puzzle solver and BFS/A* benchmark')
+    parser.add_argument('--build-oracle', action='store_true',
+                        help='precompute the oracle table and exit')
+    parser.add_argument('--check-oracle', type=int, metavar='N',
+                        help='cross-check the oracle against A* on N instances and exit')
+    parser.add_argument('--instances', type=int, default=1000,
+                        help='number of random instances in the benchmark')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the benchmark instances')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for the benchmark (default: all cores)')
+    parser.add_argument('--width', type=int, default=3,
+                        help='board width: 3 for the 8-puzzle, 4 for the 15-puzzle, ...; the benchmark '
+                             'skips BFS on boards wider than 3 and scrambles them by %d moves unless --scramble '
+                             'is given' % LARGE_BOARD_SCRAMBLE)
+    parser.add_argument('--scramble', type=int, default=None, metavar='MOVES',
+                        help='benchmark random walks of MOVES slides instead of uniform random boards')
+    parser.add_argument('--scaling', action='store_true',
+                        help='report A*/IDA* nodes per second on 3x3, 4x4 and 5x5 boards and exit')
+    parser.add_argument('--stats-out', metavar='FILE',
+                        help='write the search statistics of every benchmark run to FILE (.json or .csv)')
+    options = parser.parse_args()
+
+    # Precomputation mode: build (or refresh the cached) oracle table and exit
+    if options.build_oracle:
+        print("Oracle table ready at", get_oracle().path)
+        return
+    if options.check_oracle is not None:
+        sys.exit(0 if cross_check_oracle(options.check_oracle) else 1)
+    if options.scaling:
+        benchmark_scaling((3, 4, 5), min(options.instances, 20), options.scramble or LARGE_BOARD_SCRAMBLE,
+                          options.seed, options.workers)
+        return
+
     initial_state = []
     print("Enter your puzzle state row by row. Use '0' to represent the blank.")
-    for i in range(3):
+    for i in range(options.width):
         row = input(f"Enter row {i+1} with numbers separated by space: ").strip().split()
         initial_state.append([int(n) for n in row])
 
     # Ask the user to choose the algorithm
-    algorithm = input("Type 'bfs' to use Breadth-First Search or 'a*' to use A* Search: ").strip()
+    algorithm = input("Type 'bfs' to use Breadth-First Search, 'bidirectional' to use bidirectional BFS, 'a*' to use A* Search, 'a*-pdb' to use A* with pattern databases, 'ida*' or 'sma*' for memory-bounded A* or 'oracle' to use the precomputed table: ").strip()
 
     solution_state = None
-    if algorithm.lower() == 'bfs':
-        solution_state = bfs(initial_state)
-    elif algorithm.lower() == 'a*':
-        solution_state = a_star(initial_state) 
+    if algorithm.lower() in ('bfs', 'bidirectional', 'a*', 'a*-pdb', 'ida*', 'sma*', 'oracle'):
+        solution_state = run_algorithm(algorithm, initial_state)
 
     if solution_state:
         actions = reconstruct_path(solution_state)
@@ -181,26 +696,53 @@ def main():
         print("Total cost (number of moves):", len(actions))
     else:
         print("No solution found!")
-        
-    bfs_costs = []
-    a_star_costs = []
-    
-    for _ in range(1000):
-        initial_state = generate_random_state()
-        bfs_solution = bfs(initial_state)
-        a_star_solution = a_star(initial_state)
-        if bfs_solution:
-            bfs_costs.append(len(reconstruct_path(bfs_solution)))
-        if a_star_solution:
-            a_star_costs.append(len(reconstruct_path(a_star_solution)))
-            
-    avg_bfs_cost = sum(bfs_costs) / len(bfs_costs)
+
+    scramble = options.scramble
+    if scramble is None and options.width > 3:
+        scramble = LARGE_BOARD_SCRAMBLE
+        print("Benchmarking random walks of %d moves (see --scramble)" % scramble)
+    instances = generate_instances(options.instances, options.seed, options.width, scramble)
+    start_time = time.perf_counter()
+    bfs_results = solve_batch(instances, 'bfs', options.workers) if options.width == 3 else []
+    a_star_results = solve_batch(instances, 'a*', options.workers)
+    pdb_results = solve_batch(instances, 'a*-pdb', options.workers)
+    ida_star_results = solve_batch(instances, 'ida*', options.workers)
+    sma_star_results = solve_batch(instances, 'sma*', options.workers)
+    print("Benchmark of %d instances took %.2f seconds" % (len(instances), time.perf_counter() - start_time))
+    if options.stats_out:
+        all_results = bfs_results + a_star_results + pdb_results + ida_star_results + sma_star_results
+        export_stats([result.stats for result in all_results], options.stats_out)
+        print("Search statistics written to", options.stats_out)
+
+    bfs_costs = [result.length for result in bfs_results if result.length is not None]
+    a_star_costs = [result.length for result in a_star_results if result.length is not None]
+    manhattan_expanded = sum(result.expanded for result in a_star_results)
+    pdb_expanded = sum(result.expanded for result in pdb_results)
+
+    avg_bfs_cost = sum(bfs_costs) / len(bfs_costs) if bfs_costs else None
     avg_a_star_cost = sum(a_star_costs) / len(a_star_costs)
 
-    plt.bar(['BFS', 'A*'], [avg_bfs_cost, avg_a_star_cost])
+    print("A* nodes expanded with Manhattan distance:", manhattan_expanded)
+    print("A* nodes expanded with pattern databases:", pdb_expanded)
+    if manhattan_expanded:
+        print("Expansions saved by pattern databases: %d (%.1f%%)" % (
+            manhattan_expanded - pdb_expanded, 100.0 * (manhattan_expanded - pdb_expanded) / manhattan_expanded))
+
+    # Memory-bounded searches against plain A*, on the solvable instances
+    print("%-8s %14s %14s" % ('Search', 'Expanded', 'Peak nodes'))
+    for name, results in (('A*', a_star_results), ('IDA*', ida_star_results), ('SMA*', sma_star_results)):
+        solved = [result for result in results if result.length is not None]
+        print("%-8s %14d %14d" % (name, sum(result.expanded for result in solved),
+                                  max([result.peak_nodes for result in solved] or [0])))
+
+    if avg_bfs_cost is not None:
+        plt.bar(['BFS', 'A*'], [avg_bfs_cost, avg_a_star_cost])
+        plt.title('Average Path Cost for BFS and A* Algorithms')
+    else:
+        plt.bar(['A*'], [avg_a_star_cost])
+        plt.title('Average Path Cost for A*')
     plt.xlabel('Algorithm')
     plt.ylabel('Average Cost')
-    plt.title('Average Path Cost for BFS and A* Algorithms')
     plt.show()
     
 if __name__ == "__main__":
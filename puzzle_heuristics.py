@@ -0,0 +1,59 @@
+# Precomputed Manhattan distance tables for the sliding-tile puzzle.
+#
+# For a set of goal boards, table[tile][position] holds the Manhattan
+# distance of `tile` standing at `position` to its closest goal square
+# (the minimum over the goals, taken per tile as the original heuristic
+# did). The heuristic is additive over tiles, so after a slide only the
+# moved tile changes and h can be updated in O(1).
+
+from puzzle_state import WIDTH, to_tiles
+
+
+class ManhattanTable:
+    def __init__(self, goals, width=WIDTH):
+        self.width = width
+        self.size = width * width
+        self.goals = tuple(to_tiles(goal) for goal in goals)
+        self.table = self._build()
+
+    def _build(self):
+        goal_positions = [{tile: position for position, tile in enumerate(goal)} for goal in self.goals]
+        table = [[0] * self.size for _ in range(self.size)]
+        for tile in range(1, self.size):
+            for position in range(self.size):
+                row, col = divmod(position, self.width)
+                best = None
+                for positions in goal_positions:
+                    goal_row, goal_col = divmod(positions[tile], self.width)
+                    distance = abs(row - goal_row) + abs(col - goal_col)
+                    if best is None or distance < best:
+                        best = distance
+                table[tile][position] = best
+        return table
+
+    # Full evaluation, used once for the start state
+    def distance(self, tiles):
+        table = self.table
+        return sum(table[tile][position] for position, tile in enumerate(tiles))
+
+    # Heuristic of the child reached by sliding the tile at `target` into
+    # `blank`, given the parent's heuristic `h`
+    def update(self, h, tiles, blank, target):
+        row = self.table[tiles[target]]
+        return h - row[target] + row[blank]
+
+
+# Registry of tables by name, so each goal set is only tabulated once
+_TABLES = {}
+
+
+def register_goals(name, goals, width=WIDTH):
+    table = ManhattanTable(goals, width)
+    _TABLES[name] = table
+    return table
+
+
+def get_table(name):
+    if name not in _TABLES:
+        raise KeyError("No heuristic table registered under " + repr(name))
+    return _TABLES[name]
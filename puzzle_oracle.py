@@ -0,0 +1,129 @@
+# Complete solution table for the 3x3 sliding puzzle.
+#
+# For odd widths the inversion parity of the tiles (read in row order,
+# skipping the blank) never changes, so only 9!/2 = 181,440 boards can reach
+# the goals. A board is hashed perfectly into that range as
+#     blank position * 8!/2 + Lehmer rank of the tile order // 2
+# (ranks 2k and 2k+1 differ by swapping the last two tiles, i.e. they are
+# the two parity classes). One retrograde BFS seeded with every goal fills,
+# for each board, the distance to the nearest goal and the move that gets
+# one step closer, packed into a single byte. The table is saved to the
+# cache directory and mmapped by later runs, after which solving is a table
+# walk with no search.
+
+import hashlib
+import mmap
+import os
+from collections import deque
+
+from puzzle_pdb import CACHE_DIR, save_table
+from puzzle_solvability import count_inversions
+from puzzle_state import MOVE_TABLE, REVERSE_MOVE, WIDTH, slide, to_tiles
+
+SIZE = WIDTH * WIDTH
+CLASS_SIZE = 20160  # 8! / 2 tile orders per blank position
+TABLE_SIZE = SIZE * CLASS_SIZE
+MOVE_NAMES = ('Up', 'Down', 'Left', 'Right')
+DISTANCE_BITS = 5
+DISTANCE_MASK = (1 << DISTANCE_BITS) - 1
+UNREACHED = 0xFF
+
+
+def lehmer_rank(sequence):
+    rank = 0
+    length = len(sequence)
+    for i in range(length):
+        value = sequence[i]
+        smaller = 0
+        for j in range(i + 1, length):
+            if sequence[j] < value:
+                smaller += 1
+        rank = rank * (length - i) + smaller
+    return rank
+
+
+def tile_order(tiles):
+    return [tile for tile in tiles if tile != 0]
+
+
+def inversion_parity(tiles):
+    return count_inversions(tiles) & 1
+
+
+def oracle_index(tiles, blank=None):
+    if blank is None:
+        blank = tiles.index(0)
+    return blank * CLASS_SIZE + (lehmer_rank(tile_order(tiles)) >> 1)
+
+
+# Retrograde multi-source BFS; each entry is (move index << 5) | distance
+def build_oracle_table(goals):
+    table = bytearray([UNREACHED]) * TABLE_SIZE
+    queue = deque()
+    for goal in goals:
+        index = oracle_index(goal)
+        if table[index] == UNREACHED:
+            table[index] = 0
+            queue.append((goal, goal.index(0), 0))
+
+    while queue:
+        tiles, blank, distance = queue.popleft()
+        for name, target in MOVE_TABLE[blank]:
+            child = slide(tiles, blank, target)
+            index = oracle_index(child, target)
+            if table[index] == UNREACHED:
+                # From the child, undoing this slide leads back towards a goal
+                table[index] = (MOVE_NAMES.index(REVERSE_MOVE[name]) << DISTANCE_BITS) | (distance + 1)
+                queue.append((child, target, distance + 1))
+    return table
+
+
+def _cache_path(goals, cache_dir):
+    key = hashlib.sha1(repr((WIDTH, goals)).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, 'oracle-%s.bin' % key)
+
+
+class SolutionOracle:
+    def __init__(self, goals, cache_dir=CACHE_DIR):
+        self.goals = tuple(to_tiles(goal) for goal in goals)
+        self.parities = set(inversion_parity(goal) for goal in self.goals)
+        if len(self.parities) > 1:
+            raise ValueError("The oracle index needs all goals in one parity class")
+        self.path = _cache_path(self.goals, cache_dir)
+        self.table = self._load_or_build()
+
+    def _load_or_build(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        table = build_oracle_table(self.goals)
+        save_table(table, self.path)
+        return table
+
+    def _entry(self, tiles):
+        if inversion_parity(tiles) not in self.parities:
+            return UNREACHED
+        return self.table[oracle_index(tiles)]
+
+    # Number of moves to the nearest goal, or None if no goal is reachable
+    def distance(self, tiles):
+        entry = self._entry(to_tiles(tiles))
+        return None if entry == UNREACHED else entry & DISTANCE_MASK
+
+    # Optimal list of moves, or None if no goal is reachable
+    def solve(self, tiles):
+        tiles = to_tiles(tiles)
+        entry = self._entry(tiles)
+        if entry == UNREACHED:
+            return None
+        blank = tiles.index(0)
+        moves = []
+        while entry & DISTANCE_MASK:
+            name = MOVE_NAMES[entry >> DISTANCE_BITS]
+            target = dict(MOVE_TABLE[blank])[name]
+            tiles = slide(tiles, blank, target)
+            blank = target
+            moves.append(name)
+            entry = self.table[oracle_index(tiles, blank)]
+        return moves
@@ -0,0 +1,141 @@
+# Disjoint additive pattern databases for the sliding-tile puzzle.
+#
+# Each pattern is a group of tiles; its table stores, for every placement of
+# those tiles, the number of moves of pattern tiles needed to bring them home
+# (moves of other tiles are free). The patterns are disjoint, so the table
+# values can be summed and the result is still admissible. With several goal
+# boards the heuristic is the minimum of the per-goal sums.
+#
+# Tables are one byte per entry, indexed by the pattern tile positions in
+# base width*width, and are written to CACHE_DIR so later runs can mmap them
+# instead of rebuilding.
+
+import hashlib
+import mmap
+import os
+import tempfile
+from collections import deque
+
+from puzzle_state import WIDTH, build_move_table, to_tiles
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.puzzle_cache')
+UNREACHED = 255
+
+
+# Split the tiles into consecutive groups: 4 tiles per pattern up to 4x4,
+# 3 tiles per pattern beyond, which keeps the tables and the build time small
+def default_patterns(width):
+    tiles = list(range(1, width * width))
+    group = 4 if width <= 4 else 3
+    return tuple(tuple(tiles[start:start + group]) for start in range(0, len(tiles), group))
+
+
+def pattern_index(positions, size):
+    index = 0
+    for position in reversed(positions):
+        index = index * size + position
+    return index
+
+
+# Backward 0-1 BFS from the goal over (pattern tile positions, blank)
+def build_pattern_table(goal, pattern, width=WIDTH):
+    size = width * width
+    neighbours = [[target for _, target in moves] for moves in build_move_table(width)]
+    start = (tuple(goal.index(tile) for tile in pattern), goal.index(0))
+    cost = {start: 0}
+    queue = deque([start])
+    table = bytearray([UNREACHED]) * (size ** len(pattern))
+
+    while queue:
+        node = queue.popleft()
+        positions, blank = node
+        moves = cost[node]
+        index = pattern_index(positions, size)
+        if moves < table[index]:
+            table[index] = moves
+        for target in neighbours[blank]:
+            if target in positions:
+                slot = positions.index(target)
+                child = (positions[:slot] + (blank,) + positions[slot + 1:], target)
+                step = 1
+            else:
+                child = (positions, target)
+                step = 0
+            if child not in cost or moves + step < cost[child]:
+                cost[child] = moves + step
+                if step:
+                    queue.append(child)
+                else:
+                    queue.appendleft(child)
+    return table
+
+
+def _cache_path(goal, pattern, width, cache_dir):
+    key = hashlib.sha1(repr((width, goal, pattern)).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, 'pdb-%s.bin' % key)
+
+
+# Memory-map the table from the cache, building and saving it on first use
+def load_or_build(goal, pattern, width=WIDTH, cache_dir=CACHE_DIR):
+    path = _cache_path(goal, pattern, width, cache_dir)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    table = build_pattern_table(goal, pattern, width)
+    save_table(table, path)
+    return table
+
+
+# Write a table to the cache. Several processes may build the same table at once, so each one writes its own
+# temporary file; whichever rename comes last leaves an identical table, and a failed write only loses the cache
+def save_table(table, path):
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(table)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class PatternDatabase:
+    def __init__(self, goals, patterns=None, width=WIDTH, cache_dir=CACHE_DIR):
+        if patterns is None:
+            patterns = default_patterns(width)
+        self.width = width
+        self.size = width * width
+        self.patterns = tuple(tuple(pattern) for pattern in patterns)
+        self.goals = tuple(to_tiles(goal) for goal in goals)
+        self.tables = [[load_or_build(goal, pattern, width, cache_dir) for pattern in self.patterns]
+                       for goal in self.goals]
+
+    def _lookup(self, where):
+        size = self.size
+        best = None
+        for tables in self.tables:
+            total = 0
+            for pattern, table in zip(self.patterns, tables):
+                total += table[pattern_index([where[tile] for tile in pattern], size)]
+            if best is None or total < best:
+                best = total
+        return best
+
+    def distance(self, tiles):
+        where = [0] * self.size
+        for position, tile in enumerate(tiles):
+            where[tile] = position
+        return self._lookup(where)
+
+    # Same signature as ManhattanTable.update: heuristic of the child reached
+    # by sliding the tile at `target` into `blank`
+    def update(self, h, tiles, blank, target):
+        where = [0] * self.size
+        for position, tile in enumerate(tiles):
+            where[tile] = position
+        where[tiles[target]] = blank
+        where[0] = target
+        return self._lookup(where)
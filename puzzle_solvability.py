@@ -0,0 +1,104 @@
+# Solvability tests for N x N sliding puzzles.
+#
+# A slide never changes the parity of the inversion count (blank excluded)
+# on odd widths. On even widths a vertical slide flips it and moves the blank
+# one row, so inversions + blank row is the invariant. A board can reach a
+# goal exactly when it has the same parity class as that goal.
+#
+# Inversions are counted with a Fenwick tree in O(n log n). The *_batch
+# functions work on a (k, N*N) numpy array of boards at once, and the random
+# generators produce boards of a wanted class directly: swapping two tiles
+# (not the blank) flips the class, so each shuffle that lands in the wrong
+# class is fixed with one swap instead of being rejected. Both members of a
+# swapped pair map to the same board, so the result is still uniform.
+
+from math import isqrt
+
+import numpy as np
+
+
+def count_inversions(tiles):
+    size = len(tiles)
+    tree = [0] * (size + 1)
+    inversions = 0
+    seen = 0
+    for value in tiles:
+        if value == 0:
+            continue
+        # Tiles seen so far that are larger than this one
+        index = value
+        smaller = 0
+        while index > 0:
+            smaller += tree[index]
+            index -= index & -index
+        inversions += seen - smaller
+        index = value
+        while index <= size:
+            tree[index] += 1
+            index += index & -index
+        seen += 1
+    return inversions
+
+
+def parity_class(tiles, width=None):
+    if width is None:
+        width = isqrt(len(tiles))
+    inversions = count_inversions(tiles)
+    if width % 2 == 0:
+        inversions += width - tiles.index(0) // width
+    return inversions % 2
+
+
+def count_inversions_batch(boards):
+    boards = np.asarray(boards)
+    boards = boards.reshape(len(boards), -1)
+    inversions = np.zeros(len(boards), dtype=np.int64)
+    for i in range(boards.shape[1] - 1):
+        tail = boards[:, i + 1:]
+        inversions += np.count_nonzero((tail < boards[:, i:i + 1]) & (tail != 0), axis=1)
+    return inversions
+
+
+def parity_class_batch(boards, width=None):
+    boards = np.asarray(boards)
+    boards = boards.reshape(len(boards), -1)
+    if width is None:
+        width = isqrt(boards.shape[1])
+    inversions = count_inversions_batch(boards)
+    if width % 2 == 0:
+        inversions += width - np.argmax(boards == 0, axis=1) // width
+    return inversions % 2
+
+
+# Boolean mask of the boards whose parity class is one of `classes`
+def solvable_mask(boards, classes, width=None):
+    return np.isin(parity_class_batch(boards, width), list(classes))
+
+
+# Swap the first two non-blank tiles of a flat board in place
+def _swap_two_tiles(board):
+    first, second = [index for index in range(3) if board[index] != 0][:2]
+    board[first], board[second] = board[second], board[first]
+
+
+# A uniformly random board of one of the parity classes in `classes`
+def random_solvable_state(rng, width, classes):
+    board = np.arange(width * width)
+    rng.shuffle(board)
+    if parity_class(tuple(board.tolist()), width) not in classes:
+        _swap_two_tiles(board)
+    return board.reshape((width, width))
+
+
+def random_solvable_states(count, rng, width, classes):
+    size = width * width
+    boards = np.argsort(rng.random((count, size)), axis=1)
+    wrong = ~solvable_mask(boards, classes, width)
+    # First two non-blank columns: 1 and 2 if the blank is in column 0,
+    # 0 and 2 if it is in column 1, otherwise 0 and 1
+    first = np.where(boards[:, 0] == 0, 1, 0)
+    second = np.where((boards[:, 0] == 0) | (boards[:, 1] == 0), 2, 1)
+    rows = np.nonzero(wrong)[0]
+    first, second = first[rows], second[rows]
+    boards[rows, first], boards[rows, second] = boards[rows, second], boards[rows, first].copy()
+    return boards.reshape((count, width, width))
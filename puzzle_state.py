@@ -0,0 +1,104 @@
+# Compact state encoding for N x N sliding-tile puzzles.
+#
+# A board is a flat tuple of tiles in row-major order, 0 being the blank.
+# Tuples hash and compare natively, so they are much cheaper than numpy
+# arrays for the millions of small boards a search touches. The blank index
+# is carried next to the tiles and the legal slides for every blank position
+# are precomputed once per width in a move table.
+#
+# Boards can also be packed into one integer with a fixed number of bits per
+# tile: 4 bits covers the 3x3 and 4x4 puzzles (36 and 64 bits), 5 bits the
+# 5x5 one. Since the blank is 0, a slide changes the packed value by moving a
+# single tile, which is an O(1) update from the parent's code.
+
+from collections import namedtuple
+from math import isqrt
+
+WIDTH = 3
+REVERSE_MOVE = {'Up': 'Down', 'Down': 'Up', 'Left': 'Right', 'Right': 'Left'}
+
+
+# Build, for every blank index, the list of (move name, new blank index)
+# in the same Up, Down, Left, Right order the original solver used
+def build_move_table(width):
+    table = []
+    for blank in range(width * width):
+        row, col = divmod(blank, width)
+        moves = []
+        if row > 0:
+            moves.append(('Up', blank - width))
+        if row < width - 1:
+            moves.append(('Down', blank + width))
+        if col > 0:
+            moves.append(('Left', blank - 1))
+        if col < width - 1:
+            moves.append(('Right', blank + 1))
+        table.append(tuple(moves))
+    return tuple(table)
+
+
+# Everything that only depends on the board width, built once per width
+Board = namedtuple('Board', ['width', 'size', 'bits', 'move_table', 'shifts'])
+
+_BOARDS = {}
+
+
+def bits_per_tile(size):
+    return max(4, (size - 1).bit_length())
+
+
+def board_for_size(size):
+    board = _BOARDS.get(size)
+    if board is None:
+        width = isqrt(size)
+        if width * width != size:
+            raise ValueError("A sliding puzzle needs a square number of tiles, got %d" % size)
+        bits = bits_per_tile(size)
+        shifts = tuple((size - 1 - position) * bits for position in range(size))
+        board = Board(width, size, bits, build_move_table(width), shifts)
+        _BOARDS[size] = board
+    return board
+
+
+def board_for_width(width):
+    return board_for_size(width * width)
+
+
+MOVE_TABLE = board_for_width(WIDTH).move_table
+
+
+# Turn a nested list, a numpy array or a flat sequence into a tile tuple
+def to_tiles(state):
+    if isinstance(state, tuple) and all(type(value) is int for value in state):
+        return state
+    if hasattr(state, 'ravel'):
+        return tuple(int(value) for value in state.ravel())
+    tiles = []
+    for item in state:
+        if hasattr(item, '__len__'):
+            tiles.extend(int(value) for value in item)
+        else:
+            tiles.append(int(item))
+    return tuple(tiles)
+
+
+# Slide the tile at `target` into the blank at `blank`
+def slide(tiles, blank, target):
+    new_tiles = list(tiles)
+    new_tiles[blank] = tiles[target]
+    new_tiles[target] = 0
+    return tuple(new_tiles)
+
+
+# Pack a tile tuple into a single integer, bits_per_tile(size) bits per tile
+def pack(tiles):
+    bits = bits_per_tile(len(tiles))
+    code = 0
+    for value in tiles:
+        code = (code << bits) | value
+    return code
+
+
+# Packed code after sliding `tile` from `target` into the blank at `blank`
+def slide_packed(code, tile, blank, target, shifts):
+    return code + (tile << shifts[blank]) - (tile << shifts[target])
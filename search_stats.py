@@ -0,0 +1,92 @@
+# Search statistics shared by the sliding puzzle solvers and the Pacman
+# search strategies.
+#
+# A search keeps its counters in local variables and hands them over once,
+# when it returns, through `update(**counts)`. That is the same call as
+# dict.update, so a plain dict can be passed instead of a SearchStats, and
+# passing nothing (stats=None) costs the search a few integer increments.
+#
+# Counters:
+#     expanded      nodes whose successors were generated
+#     generated     successors created
+#     duplicates    successors or popped nodes dropped as already explored
+#     max_frontier  largest size of the open list
+#     peak_nodes    largest number of nodes held in memory at once
+# `phases` maps a phase name (setup, search, reconstruct, ...) to seconds;
+# phase times of repeated updates are added up.
+
+import csv
+import json
+
+COUNTERS = ('expanded', 'generated', 'duplicates', 'max_frontier', 'peak_nodes')
+
+
+class SearchStats:
+    def __init__(self, algorithm=None, **labels):
+        self.algorithm = algorithm
+        self.labels = labels
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.max_frontier = 0
+        self.peak_nodes = 0
+        self.solution_length = None
+        self.phases = {}
+
+    def update(self, phases=None, **counts):
+        for name, value in counts.items():
+            setattr(self, name, value)
+        if phases:
+            for name, seconds in phases.items():
+                self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def total_seconds(self):
+        return sum(self.phases.values())
+
+    # Flat dict with one 'seconds_<phase>' entry per phase, for export
+    def as_dict(self):
+        row = {'algorithm': self.algorithm}
+        row.update(self.labels)
+        for name in COUNTERS:
+            row[name] = getattr(self, name)
+        row['solution_length'] = self.solution_length
+        for name, seconds in self.phases.items():
+            row['seconds_' + name] = seconds
+        return row
+
+    def __repr__(self):
+        return 'SearchStats(%s)' % ', '.join('%s=%r' % item for item in self.as_dict().items())
+
+
+# Write a list of SearchStats (or their dicts) to an open file
+def write_json(stats_list, f):
+    json.dump([_as_row(stats) for stats in stats_list], f, indent=2)
+    f.write('\n')
+
+
+def write_csv(stats_list, f):
+    rows = [_as_row(stats) for stats in stats_list]
+    columns = []
+    for row in rows:
+        for name in row:
+            if name not in columns:
+                columns.append(name)
+    writer = csv.DictWriter(f, fieldnames=columns, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+# Pick the format from the file extension (.csv, anything else is JSON)
+def export(stats_list, path):
+    with open(path, 'w', newline='') as f:
+        if path.lower().endswith('.csv'):
+            write_csv(stats_list, f)
+        else:
+            write_json(stats_list, f)
+
+
+def _as_row(stats):
+    return stats.as_dict() if isinstance(stats, SearchStats) else dict(stats)